@@ -8,10 +8,25 @@ from .reciprocal_dict import BijectiveDict
 from .extratuple import namedtuple
 from .extratuple import defaultnamedtuple
 from .extratuple import fastnamedtuple
-from .binary_tree_dict import TreeDict
+from .binary_tree_dict import (
+    TreeDict,
+    TreeMultiDict,
+    IntervalTreeDict,
+    ConcurrentTreeDict,
+    NumericTreeDict,
+)
 from .grouper import Grouper
 from .nested_data import NestedData
-from .trie import PrefixTrie, Trie, NormalizedTrie
+from .trie import (
+    PrefixTrie,
+    Trie,
+    NormalizedTrie,
+    RadixTrie,
+    ScoredTrie,
+    SuffixArrayTrie,
+)
+from .frozen_trie import FrozenTrie, MappedTrie
+from .aho_corasick import AhoCorasick
 from .blobdict import BlobTextDict
 
 __author__ = "João S. O. Bueno"
@@ -29,10 +44,20 @@ __all__ = [
     "defaultnamedtuple",
     "fastnamedtuple",
     "TreeDict",
+    "TreeMultiDict",
+    "IntervalTreeDict",
+    "ConcurrentTreeDict",
+    "NumericTreeDict",
     "Grouper",
     "NestedData",
     "PrefixTrie",
     "Trie",
     "NormalizedTrie",
+    "RadixTrie",
+    "ScoredTrie",
+    "SuffixArrayTrie",
+    "FrozenTrie",
+    "MappedTrie",
+    "AhoCorasick",
     "BlobTextDict",
 ]
@@ -0,0 +1,112 @@
+"""
+Aho-Corasick automaton: finds all occurrences of a set of words
+in a text, in a single pass over it.
+"""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """Scans texts for every occurrence of a set of words, in linear time
+
+    Build it from any iterable of words - including any of the
+    tries in extradict, or by calling ".scanner()" on them - and
+    call ".scan(text)" to lazily retrieve (offset, word) pairs
+    for each occurrence of each word in text. Overlapping occurrences
+    are all reported: scanning "she sells" for "she" and "he" finds both.
+
+    text can also be an iterable of strings, like a file, or
+    a stream of chunks, in which case offsets count from the start
+    of the first chunk, and words spanning chunk boundaries are found.
+
+    The automaton is a trie of the words, in which each state has a failure
+    link, pointing to the state for the longest suffix of its text which
+    is also a prefix of some word, and an output link, pointing to the
+    next state along the failure links where a word ends.
+    """
+
+    def __init__(self, words=()):
+        self.transitions = [{}]
+        # The word ending at each state, if any
+        self.words = [None]
+        self.fail = [0]
+        self.output = [0]
+        for word in words:
+            self._insert(word)
+        self._link()
+
+    def _insert(self, word):
+        if not word:
+            # The empty word would be found between every two characters
+            return
+        state = 0
+        for char in word:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions[state][char] = next_state
+                self.transitions.append({})
+                self.words.append(None)
+            state = next_state
+        self.words[state] = word
+
+    def _link(self):
+        """Sets the failure and output links, visiting states in breadth-first order"""
+        transitions, words = self.transitions, self.words
+        fail = self.fail = [0] * len(transitions)
+        output = self.output = [0] * len(transitions)
+        queue = deque(transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in transitions[state].items():
+                queue.append(child)
+                link = fail[state]
+                while link and char not in transitions[link]:
+                    link = fail[link]
+                fail[child] = transitions[link].get(char, 0)
+                output[child] = (
+                    fail[child]
+                    if words[fail[child]] is not None
+                    else output[fail[child]]
+                )
+
+    def scan(self, text):
+        """Lazily yields (offset, word) for each occurrence of the words in text
+
+        Occurrences come in the order they end in the text, the longest
+        first when several end at the same position.
+        """
+        transitions, fail, output, words = (
+            self.transitions,
+            self.fail,
+            self.output,
+            self.words,
+        )
+        chunks = (text,) if isinstance(text, str) else text
+        state = 0
+        position = 0
+        for chunk in chunks:
+            for char in chunk:
+                position += 1
+                while True:
+                    next_state = transitions[state].get(char)
+                    if next_state is not None:
+                        state = next_state
+                        break
+                    if not state:
+                        break
+                    state = fail[state]
+                match = state if words[state] is not None else output[state]
+                while match:
+                    word = words[match]
+                    yield position - len(word), word
+                    match = output[match]
+
+    def __len__(self):
+        return sum(word is not None for word in self.words)
+
+    def __repr__(self):
+        return f"AhoCorasick scanner for {len(self)} words."
+
+
+__all__ = ["AhoCorasick"]
@@ -1,7 +1,20 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import threading
+from collections import Counter
 from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
 from copy import copy
-from itertools import zip_longest
-from operator import le as le_op, ge as ge_op
+from functools import wraps
+from itertools import islice, zip_longest
+from operator import (
+    eq as eq_op,
+    ne as ne_op,
+    lt as lt_op,
+    le as le_op,
+    gt as gt_op,
+    ge as ge_op,
+)
 
 """Implements an AVLTree auto=balancing tree with a Python Mapping interface"""
 
@@ -48,11 +61,11 @@ class PlainNode:
     ):
         self.key = key
         self.value = value if value != _empty else key
-        self.left = left
-        self.right = right
         self.key_func = key_func
         self._depth = 1
         self._len = 1
+        self.left = left
+        self.right = right
 
     @property
     def leaf(self):
@@ -134,23 +147,49 @@ class PlainNode:
         if self_key == new_key:
             if self.leaf:
                 return EmptyNode
+            # Take the place of the in-order neighbour on the deeper side,
+            # removing it from there.
             target_str = "left" if self.left.depth > self.right.depth else "right"
-            target = getattr(self, target_str)
-            self._mute_into(target)
-            key = target.key  # key to delete in target subtree.
-        else:
-            target_str = "left" if new_key < self_key else "right"
-            target = getattr(self, target_str)
+            other_side = "right" if target_str == "left" else "left"
+            new_target, neighbour = getattr(self, target_str).pop_extreme(other_side)
+            self._mute_into(neighbour)
+            setattr(self, target_str, new_target)
+            return self
+        target_str = "left" if new_key < self_key else "right"
+        target = getattr(self, target_str)
 
         setattr(self, target_str, target.delete(key))
         self._update_depth()
         self._update_len()
         return self
 
+    def pop_extreme(self, side):
+        """Removes the node at the extreme "left" or "right" of this subtree
+
+        Returns:
+            A 2-tuple with the new root for this subtree (which
+            will be EmptyNode if this node was the only one) and the removed node.
+        """
+        target = getattr(self, side)
+        if not target:
+            return getattr(self, "right" if side == "left" else "left"), self
+        new_target, node = target.pop_extreme(side)
+        setattr(self, side, new_target)
+        return self, node
+
     def __iter__(self):
-        yield from self.left
-        yield self
-        yield from self.right
+        # Explicit stack instead of recursive generators:
+        # no chained generators per level, and no recursion limit
+        # for deep (unbalanced) trees.
+        stack = []
+        node = self
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
 
     def __len__(self):
         # This and .depth() where built as lazy properties,
@@ -178,12 +217,11 @@ class PlainNode:
         )
         start = start or start_fallback
         start_key = start._cmp_key(start.key)
-        slice_start_key = start._cmp_key(slice_.start)
 
         if slice_.stop is not None and operator(start_key, start._cmp_key(slice_.stop)):
             return
 
-        if slice_.start is None or operator(start_key, slice_start_key):
+        if slice_.start is None or operator(start_key, start._cmp_key(slice_.start)):
             yield start
             counter = 0
         else:
@@ -222,6 +260,31 @@ class PlainNode:
         path.append(EmptyNode)
         return path
 
+    def find_sorted(self, sorted_keys, lo=0, hi=None, results=None):
+        """Finds the nodes for a batch of comparison keys in a single walk.
+
+        `sorted_keys` must be already transformed by key_func and sorted: the
+        batch is split around each visited node and the halves passed
+        down to its subtrees, so the search paths for neighbouring keys
+        are walked only once.
+
+        Returns:
+            A list with the matching node, or EmptyNode, for each key.
+        """
+        if hi is None:
+            hi = len(sorted_keys)
+            results = [EmptyNode] * hi
+        self_key = self._cmp_key(self.key)
+        start = bisect_left(sorted_keys, self_key, lo, hi)
+        end = bisect_right(sorted_keys, self_key, start, hi)
+        for index in range(start, end):
+            results[index] = self
+        if lo < start and self.left:
+            self.left.find_sorted(sorted_keys, lo, start, results)
+        if end < hi and self.right:
+            self.right.find_sorted(sorted_keys, end, hi, results)
+        return results
+
     def get_closest(self, key, path=None):
         """Retrieves two closest nodes on the tree to given key.
 
@@ -252,6 +315,48 @@ class PlainNode:
             closest,
         )
 
+    def iter_nearest(self, key, distance=None):
+        """Yields all nodes in this subtree, starting with the ones closest to key
+
+        The search path for key is walked outwards in both directions,
+        so retrieving the first k nodes takes O(log(N) + k) steps.
+
+        If `distance` is given, it is called as `distance(key, node_key)` and the
+        side yielding the smallest distance is picked at each step. Otherwise,
+        closeness is by ordinal position, and nodes are yielded alternating
+        one from each side, starting with the smaller one.
+        A node matching key exactly is always yielded first.
+        """
+        path = self.get_node_path(key)
+        if path[-1]:
+            yield path[-1]
+            lower_path = self._traverse_to_side(list(path), "left")
+            higher_path = self._traverse_to_side(path, "right")
+        else:
+            path.pop()
+            if self._cmp_key(key) > self._cmp_key(path[-1].key):
+                lower_path = path
+                higher_path = self._traverse_to_side(list(path), "right")
+            else:
+                higher_path = path
+                lower_path = self._traverse_to_side(list(path), "left")
+        lower = lower_path[-1] if lower_path else EmptyNode
+        higher = higher_path[-1] if higher_path else EmptyNode
+        lower_turn = True
+        while lower or higher:
+            if distance is not None and lower and higher:
+                lower_turn = distance(key, lower.key) <= distance(key, higher.key)
+            if lower and (lower_turn or not higher):
+                yield lower
+                lower_path = self._traverse_to_side(lower_path, "left")
+                lower = lower_path[-1] if lower_path else EmptyNode
+                lower_turn = False
+            else:
+                yield higher
+                higher_path = self._traverse_to_side(higher_path, "right")
+                higher = higher_path[-1] if higher_path else EmptyNode
+                lower_turn = True
+
     def _cmp_key(self, key):
         return self.key_func(key) if self.key_func else key
 
@@ -351,13 +456,24 @@ class AVLNode(PlainNode):
         self.balance()
         return result
 
+    def pop_extreme(self, side):
+        result = super().pop_extreme(side)
+        if result[0] is self:
+            self.balance()
+        return result
+
     def balance(self):
         if self.balanced:
             return
 
+        # A child leaning to the inner side needs a double rotation
         if self.left.depth > self.right.depth:
+            if self.left.right.depth > self.left.left.depth:
+                self.left._avl_rotate_left()
             self._avl_rotate_right()
         else:
+            if self.right.left.depth > self.right.right.depth:
+                self.right._avl_rotate_right()
             self._avl_rotate_left()
 
     def _avl_rotate_left(self):
@@ -375,6 +491,108 @@ class AVLNode(PlainNode):
         self._mute_into(new_parent, full=True)
 
 
+class IntervalNode(AVLNode):
+    """AVLNode for (start, end) keys, representing half-open intervals
+
+    Each node keeps track of the largest interval end in its subtree, in "max_end",
+    so that overlap searches can skip whole subtrees.
+    """
+
+    __slots__ = ("max_end",)
+
+    def _update_len(self):
+        super()._update_len()
+        max_end = self.key[1]
+        for child in (self.left, self.right):
+            if child and child.max_end > max_end:
+                max_end = child.max_end
+        self.max_end = max_end
+
+    def iter_overlapping(self, start, stop=None):
+        """Yields, in order, the nodes whose intervals overlap [start, stop)
+
+        If stop is None, yields the nodes whose intervals contain the point "start".
+        """
+        if self.max_end <= start:
+            return
+        if self.left:
+            yield from self.left.iter_overlapping(start, stop)
+        node_start, node_end = self.key
+        if node_start > start if stop is None else node_start >= stop:
+            # Nodes to the right start even later
+            return
+        if node_end > start:
+            yield self
+        if self.right:
+            yield from self.right.iter_overlapping(start, stop)
+
+
+class _CountingKey:
+    """Wraps a comparison key, counting each comparison made with it"""
+
+    __slots__ = ("key", "stats")
+
+    def __init__(self, key, stats):
+        self.key = key
+        self.stats = stats
+
+    def _compare(self, other, operator):
+        self.stats["comparisons"] += 1
+        return operator(self.key, other.key if type(other) is _CountingKey else other)
+
+    def __eq__(self, other):
+        return self._compare(other, eq_op)
+
+    def __ne__(self, other):
+        return self._compare(other, ne_op)
+
+    def __lt__(self, other):
+        return self._compare(other, lt_op)
+
+    def __le__(self, other):
+        return self._compare(other, le_op)
+
+    def __gt__(self, other):
+        return self._compare(other, gt_op)
+
+    def __ge__(self, other):
+        return self._compare(other, ge_op)
+
+    __hash__ = None
+
+
+def _instrumented_node_cls(node_cls, stats):
+    """Creates a subclass of node_cls which updates the counters in "stats"
+
+    Regular node classes have no instrumentation code at all, so
+    this costs nothing unless explicitly used.
+    """
+
+    class InstrumentedNode(node_cls):
+        __slots__ = ()
+
+        def _cmp_key(self, key):
+            if self.key_func:
+                stats["key_func_calls"] += 1
+                key = self.key_func(key)
+            return _CountingKey(key, stats)
+
+        def _avl_rotate_left(self):
+            stats["rotations"] += 1
+            super()._avl_rotate_left()
+
+        def _avl_rotate_right(self):
+            stats["rotations"] += 1
+            super()._avl_rotate_right()
+
+        def _traverse_to_side(self, path, side):
+            stats["slice_steps"] += 1
+            return super()._traverse_to_side(path, side)
+
+    InstrumentedNode.__name__ = "Instrumented" + node_cls.__name__
+    return InstrumentedNode
+
+
 class TreeDict(MutableMapping):
     """Implements an AVLTree autobalancing tree with a Python Mapping interface.
 
@@ -396,18 +614,99 @@ class TreeDict(MutableMapping):
     features are that `__getitem__` can retrieve a range of itens,
     and `get_closest_keys` will return a tuple of surrounding keys that exist.
 
+    If "maxlen" is given, whenever an insertion takes the size past it,
+    the item with the smallest key (or the largest, if "evict" is "max")
+    is dropped. If given, "on_evict" is called with each dropped key and value.
+
     """
 
     node_cls = AVLNode
 
-    def __init__(self, *args, key=None):
+    def __init__(
+        self,
+        *args,
+        key=None,
+        maxlen=None,
+        evict="min",
+        on_evict=None,
+        instrument=False,
+    ):
+        if maxlen is not None and maxlen < 0:
+            raise ValueError("maxlen must be a non-negative integer")
+        if evict not in ("min", "max"):
+            raise ValueError('evict must be either "min" or "max"')
         self.key = key
+        self.maxlen = maxlen
+        self.evict = evict
+        self.on_evict = on_evict
+        self._stats = None
+        if instrument:
+            self._stats = Counter(
+                comparisons=0, key_func_calls=0, rotations=0, slice_steps=0
+            )
+            self.node_cls = _instrumented_node_cls(self.node_cls, self._stats)
         self.root = EmptyNode
         if len(args) == 1 and isinstance(args[0], Mapping):
             args = args[0].items()
         for key, value in args:
             self[key] = value
 
+    @classmethod
+    def from_sorted(cls, items, **kwargs):
+        """Builds a new instance from (key, value) pairs already sorted by key.
+
+        The tree is built balanced from the start, in linear time,
+        instead of inserting one pair at a time. Input order is
+        not verified. Extra keyword arguments are passed to the constructor.
+        """
+        tree = cls(**kwargs)
+        tree._load_sorted(list(items))
+        if tree.maxlen is not None:
+            tree._evict_excess()
+        return tree
+
+    def _load_sorted(self, items):
+        self.root = self._build_balanced(items, 0, len(items))
+
+    def _build_balanced(self, items, lo, hi):
+        if lo >= hi:
+            return EmptyNode
+        middle = (lo + hi) // 2
+        key, value = items[middle]
+        return self.node_cls(
+            key,
+            value,
+            left=self._build_balanced(items, lo, middle),
+            right=self._build_balanced(items, middle + 1, hi),
+            key_func=self.key,
+        )
+
+    def _init_kwargs(self):
+        return {
+            "key": self.key,
+            "maxlen": self.maxlen,
+            "evict": self.evict,
+            "on_evict": self.on_evict,
+            "instrument": self._stats is not None,
+        }
+
+    def _iter_items(self):
+        return ((node.key, node.value) for node in self.root)
+
+    def __reduce__(self):
+        # Serializes flat, sorted, keys and values, instead of the linked nodes,
+        # which can be rebuilt in linear time.
+        items = list(self._iter_items()) if self.root else []
+        return (
+            _rebuild_tree,
+            (
+                type(self),
+                self._init_kwargs(),
+                [key for key, _ in items],
+                [value for _, value in items],
+            ),
+        )
+
     def __getitem__(self, key):
         if not self.root:
             raise KeyError(key)
@@ -415,12 +714,25 @@ class TreeDict(MutableMapping):
             return [n.value for n in self.root.iter_slice(key)]
         return self.root.get(key).value
 
-    def __setitem__(self, key, value):
+    def _insert(self, key, value):
         if self.root in (None, EmptyNode):
             self.root = self.node_cls(key=key, value=value, key_func=self.key)
         else:
             self.root.insert(key=key, value=value)
 
+    def __setitem__(self, key, value):
+        self._insert(key, value)
+        if self.maxlen is not None:
+            self._evict_excess()
+
+    def _evict_excess(self):
+        """Drops the smallest or largest items, according to "evict", to keep size within maxlen"""
+        side = "left" if self.evict == "min" else "right"
+        while len(self) > self.maxlen:
+            key, value = self._pop_extreme(side)
+            if self.on_evict:
+                self.on_evict(key, value)
+
     def __delitem__(self, key):
         if not self.root:
             raise KeyError(key)
@@ -429,12 +741,161 @@ class TreeDict(MutableMapping):
         else:
             self.root.delete(key)
 
+    def _find_many(self, keys):
+        """Retrieves the nodes for all keys in a single tree walk
+
+        Returns a list of (index, node) pairs, ordered by key, where index
+        is the position of the key in `keys`. Node is EmptyNode for missing keys.
+        """
+        cmp_keys = [self.key(key) for key in keys] if self.key else keys
+        try:
+            order = sorted(range(len(keys)), key=cmp_keys.__getitem__)
+            if not self.root:
+                return [(index, EmptyNode) for index in order]
+            nodes = self.root.find_sorted([cmp_keys[index] for index in order])
+        except TypeError:
+            raise KeyError(
+                f"{keys} have types incompatible with other keys in the tree"
+            )
+        return list(zip(order, nodes))
+
+    def _node_value(self, node, key, default):
+        return node.value if node else default
+
+    def get_many(self, keys, default=None, input_order=True):
+        """Retrieves the values for several keys at once.
+
+        The keys are sorted and searched together in a single walk
+        over the tree, which is faster than looking up each one separately.
+
+        Returns:
+            if input_order is True, a list with the values for each key in
+            the same order as `keys`. Otherwise, a list of (key, value) pairs,
+            sorted by key. `default` is used for missing keys.
+        """
+        keys = list(keys)
+        found = self._find_many(keys)
+        if not input_order:
+            return [
+                (keys[index], self._node_value(node, keys[index], default))
+                for index, node in found
+            ]
+        results = [default] * len(keys)
+        for index, node in found:
+            results[index] = self._node_value(node, keys[index], default)
+        return results
+
+    def contains_many(self, keys):
+        """Returns a list of booleans telling which of the given keys are in the tree.
+
+        Keys are searched in a single walk over the tree, as in `get_many`.
+        """
+        return [value is not _empty for value in self.get_many(keys, default=_empty)]
+
     def get_closest_keys(self, key):
         if not self.root:
             return None, None
         parent1, parent2 = self.root.get_closest(key)
         return (parent1.key if parent1 else None), (parent2.key if parent2 else None)
 
+    def floor_key(self, key):
+        """Retrieves the largest key in the tree that is smaller than or equal to key, or None"""
+        return self.get_closest_keys(key)[0]
+
+    def ceiling_key(self, key):
+        """Retrieves the smallest key in the tree that is larger than or equal to key, or None"""
+        return self.get_closest_keys(key)[1]
+
+    def _extreme_item(self, side):
+        if not self.root:
+            raise KeyError(f"{self.__class__.__name__} is empty")
+        node = self.root._get_extreme_node(side)
+        return node.key, node.value
+
+    def _pop_extreme(self, side):
+        if not self.root:
+            raise KeyError(f"{self.__class__.__name__} is empty")
+        self.root, node = self.root.pop_extreme(side)
+        return node.key, node.value
+
+    def min_item(self):
+        """Retrieves the (key, value) pair with the smallest key"""
+        return self._extreme_item("left")
+
+    def max_item(self):
+        """Retrieves the (key, value) pair with the largest key"""
+        return self._extreme_item("right")
+
+    def popmin(self):
+        """Removes and returns the (key, value) pair with the smallest key
+
+        Takes a single descent on the tree.
+        """
+        return self._pop_extreme("left")
+
+    def popmax(self):
+        """Removes and returns the (key, value) pair with the largest key"""
+        return self._pop_extreme("right")
+
+    def pop_le(self, key):
+        """Removes all items with keys smaller than or equal to key
+
+        Returns:
+            a list with the removed (key, value) pairs, in order.
+        """
+        results = []
+        if not self.root:
+            return results
+        cmp_key = self.root._cmp_key
+        limit = cmp_key(key)
+        while self.root and cmp_key(self.root._get_extreme_node("left").key) <= limit:
+            results.append(self.popmin())
+        return results
+
+    def nearest(self, key, k=1, distance=None):
+        """Retrieves a list with the k keys closest to the given key, closest first.
+
+        If `distance` is given, it is a callable that will be passed
+        the searched key and a key in the tree, and should return a number:
+        e.g. `lambda a, b: abs(a - b)` for numeric keys.
+        Otherwise keys are picked by ordinal position, alternating
+        the closest ones on each side, starting with the smaller.
+        """
+        if not self.root:
+            return []
+        return [n.key for n in islice(self.root.iter_nearest(key, distance), k)]
+
+    def stats(self, reset=False):
+        """Retrieves a dictionary with information about the inner tree.
+
+        "len", "depth" and "depth_histogram" (the number of nodes at
+        each level of the tree, starting at 1 for the root) are always present.
+
+        If the TreeDict was created with `instrument=True`, the dictionary
+        also contains the counters for key "comparisons", "key_func_calls",
+        AVL "rotations" and "slice_steps" (nodes walked while traversing slices and
+        neighbours), accumulated since creation or since the last call with
+        reset=True - which allows measuring the cost of individual operations.
+        """
+        histogram = {}
+        level = [self.root] if self.root else []
+        while level:
+            histogram[len(histogram) + 1] = len(level)
+            level = [
+                child for node in level for child in (node.left, node.right) if child
+            ]
+        result = {
+            "len": len(self),
+            "depth": self.root.depth,
+            "depth_histogram": histogram,
+        }
+        if self._stats is not None:
+            result.update(self._stats)
+            if reset:
+                for counter in self._stats:
+                    self._stats[counter] = 0
+        return result
+
     def __iter__(self):
         return (n.key for n in self.root) if self.root else iter(())
 
@@ -443,3 +904,519 @@ class TreeDict(MutableMapping):
 
     def __repr__(self):
         return f"{self.__class__.__name__}({', '.join('%r=%r' % (k, v) for k, v in self.items())}{', key_func= %r' % (self.key) if self.key else ''})"
+
+
+def _rebuild_tree(cls, kwargs, keys, values):
+    return cls.from_sorted(zip(keys, values), **kwargs)
+
+
+class TreeMultiDict(TreeDict):
+    """A TreeDict in which distinct keys can share the same sort key.
+
+    In a TreeDict, if a new key ties with an existing one under the "key"
+    function, it simply replaces the older pair. Here, each tree node holds
+    a compact bucket (a list of (key, value) pairs), and all keys that
+    sort equal are kept, in insertion order, in the same node.
+    Keys are still unique: setting an existing key (by equality) replaces its value.
+
+    Range retrieval with slices returns the values of all the entries
+    in each matching node, and `get_all` retrieves all values with
+    keys sorting equal to the given one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._len = 0
+        super().__init__(*args, **kwargs)
+
+    def _load_sorted(self, items):
+        # Entries sharing a sort key are grouped in a single bucket
+        buckets = []
+        previous = _empty
+        for key, value in items:
+            cmp_key = self.key(key) if self.key else key
+            if buckets and cmp_key == previous:
+                buckets[-1][1].append((key, value))
+            else:
+                buckets.append((key, [(key, value)]))
+            previous = cmp_key
+        super()._load_sorted(buckets)
+        self._len = len(items)
+
+    def _iter_items(self):
+        return (item for node in self.root for item in node.value)
+
+    def _find(self, key):
+        node = self.root.get(key)
+        for index, (bucket_key, _) in enumerate(node.value):
+            if bucket_key == key:
+                return node, index
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        if not self.root:
+            raise KeyError(key)
+        if isinstance(key, slice):
+            step = key.step if key.step is not None else 1
+            direction = 1 if step > 0 else -1
+            values = [
+                value
+                for node in self.root.iter_slice(slice(key.start, key.stop, direction))
+                for _, value in node.value[::direction]
+            ]
+            return values[:: abs(step)]
+        node, index = self._find(key)
+        return node.value[index][1]
+
+    def __setitem__(self, key, value):
+        try:
+            bucket = self.root.get(key).value
+        except KeyError:
+            self._insert(key, [(key, value)])
+        else:
+            for index, (bucket_key, _) in enumerate(bucket):
+                if bucket_key == key:
+                    bucket[index] = key, value
+                    return
+            bucket.append((key, value))
+        self._len += 1
+        if self.maxlen is not None:
+            self._evict_excess()
+
+    def __delitem__(self, key):
+        node, index = self._find(key)
+        bucket = node.value
+        del bucket[index]
+        self._len -= 1
+        if not bucket:
+            super().__delitem__(key)
+        elif index == 0:
+            node.key = bucket[0][0]
+
+    def _node_value(self, node, key, default):
+        for bucket_key, value in node.value if node else ():
+            if bucket_key == key:
+                return value
+        return default
+
+    def get_all(self, key):
+        """Retrieves a list with the values for all keys sorting equal to the given key"""
+        return [value for _, value in self.root.get(key).value]
+
+    def _extreme_item(self, side):
+        if not self.root:
+            raise KeyError(f"{self.__class__.__name__} is empty")
+        bucket = self.root._get_extreme_node(side).value
+        return bucket[0] if side == "left" else bucket[-1]
+
+    def _pop_extreme(self, side):
+        if not self.root:
+            raise KeyError(f"{self.__class__.__name__} is empty")
+        node = self.root._get_extreme_node(side)
+        bucket = node.value
+        if len(bucket) == 1:
+            self.root, node = self.root.pop_extreme(side)
+            item = bucket[0]
+        else:
+            item = bucket.pop(0 if side == "left" else -1)
+            node.key = bucket[0][0]
+        self._len -= 1
+        return item
+
+    def nearest(self, key, k=1, distance=None):
+        if not self.root:
+            return []
+        keys = (
+            bucket_key
+            for node in self.root.iter_nearest(key, distance)
+            for bucket_key, _ in node.value
+        )
+        return list(islice(keys, k))
+
+    def __iter__(self):
+        if not self.root:
+            return iter(())
+        return (key for node in self.root for key, _ in node.value)
+
+    def __len__(self):
+        return self._len
+
+
+class IntervalTreeDict(TreeDict):
+    """A TreeDict whose keys are (start, end) tuples representing half-open intervals
+
+    Besides the TreeDict features, `overlapping(start, stop)` retrieves
+    all the intervals overlapping [start, stop), and `overlapping(point)`
+    those containing a point, in O(log(N) + k) time, where k is the number
+    of returned intervals: each node is augmented with the maximum
+    interval end found in its subtree.
+
+    No "key" function is supported: intervals are ordered by start, then by end.
+    """
+
+    node_cls = IntervalNode
+
+    def __init__(
+        self, *args, maxlen=None, evict="min", on_evict=None, instrument=False
+    ):
+        super().__init__(
+            *args,
+            maxlen=maxlen,
+            evict=evict,
+            on_evict=on_evict,
+            instrument=instrument,
+        )
+
+    def _init_kwargs(self):
+        kwargs = super()._init_kwargs()
+        del kwargs["key"]
+        return kwargs
+
+    def __setitem__(self, key, value):
+        start, end = key
+        if end < start:
+            raise ValueError(f"Interval {key!r} ends before it starts")
+        super().__setitem__((start, end), value)
+
+    def overlapping(self, start, stop=None):
+        """Retrieves a list of (interval, value) pairs for intervals overlapping [start, stop)
+
+        If stop is not given, retrieves the intervals containing the point `start`.
+        Pairs are ordered by interval start.
+        """
+        if not self.root:
+            return []
+        return [
+            (node.key, node.value) for node in self.root.iter_overlapping(start, stop)
+        ]
+
+
+class _ReadWriteLock:
+    """A lock that can be held by many readers at once, or by a single writer.
+
+    Writers waiting for the lock take precedence over new readers,
+    so that they can't be starved. Both sides are reentrant, and
+    a thread holding the write lock can also read, but a reader can't
+    be upgraded into a writer.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._write_depth += 1
+            else:
+                if getattr(self._local, "depth", 0):
+                    raise RuntimeError("Can't acquire write lock while reading")
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+                self._write_depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+def _read_locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _write_locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.write():
+            result = method(self, *args, **kwargs)
+            # Failed writes leave the tree, and open iterators, as they were
+            self._version += 1
+            return result
+
+    return wrapper
+
+
+class ConcurrentTreeDict(TreeDict):
+    """A thread-safe TreeDict.
+
+    All operations are guarded by a readers-writer lock: any number of threads
+    can read from the tree at the same time, while writers get exclusive access.
+
+    Iteration does not hold the lock between items: instead, iterators are
+    fail-fast, and raise RuntimeError if the tree is modified while they are
+    in use, just like iterating a dict. Use `.snapshot()` to get an independent,
+    plain TreeDict copy, taken atomically, to iterate at leisure.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._lock = _ReadWriteLock()
+        self._version = 0
+        super().__init__(*args, **kwargs)
+
+    __getitem__ = _read_locked(TreeDict.__getitem__)
+    __len__ = _read_locked(TreeDict.__len__)
+    __reduce__ = _read_locked(TreeDict.__reduce__)
+    get_closest_keys = _read_locked(TreeDict.get_closest_keys)
+    floor_key = _read_locked(TreeDict.floor_key)
+    ceiling_key = _read_locked(TreeDict.ceiling_key)
+    min_item = _read_locked(TreeDict.min_item)
+    max_item = _read_locked(TreeDict.max_item)
+    nearest = _read_locked(TreeDict.nearest)
+    get_many = _read_locked(TreeDict.get_many)
+    contains_many = _read_locked(TreeDict.contains_many)
+    stats = _read_locked(TreeDict.stats)
+    __eq__ = _read_locked(TreeDict.__eq__)
+
+    __setitem__ = _write_locked(TreeDict.__setitem__)
+    __delitem__ = _write_locked(TreeDict.__delitem__)
+    popmin = _write_locked(TreeDict.popmin)
+    popmax = _write_locked(TreeDict.popmax)
+    pop_le = _write_locked(TreeDict.pop_le)
+    # The mixin methods read, then write: they must hold the lock across both steps
+    pop = _write_locked(TreeDict.pop)
+    popitem = _write_locked(TreeDict.popitem)
+    setdefault = _write_locked(TreeDict.setdefault)
+    update = _write_locked(TreeDict.update)
+
+    @_write_locked
+    def clear(self):
+        self.root = EmptyNode
+
+    @_read_locked
+    def snapshot(self):
+        """Retrieves a plain TreeDict with a copy of the current contents"""
+        items = list(self._iter_items()) if self.root else []
+        kwargs = self._init_kwargs()
+        del kwargs["instrument"]
+        return TreeDict.from_sorted(items, **kwargs)
+
+    def __repr__(self):
+        # Formatted from a copy, so that concurrent writers can't fail it midway
+        return self.__class__.__name__ + repr(self.snapshot()).removeprefix("TreeDict")
+
+    def __iter__(self):
+        with self._lock.read():
+            version = self._version
+            path = []
+            node = self.root
+            while node:
+                path.append(node)
+                node = node.left
+        while path:
+            with self._lock.read():
+                if self._version != version:
+                    raise RuntimeError(
+                        f"{self.__class__.__name__} changed during iteration"
+                    )
+                key = path[-1].key
+                path = path[-1]._traverse_to_side(path, "right")
+            yield key
+
+
+class NumericTreeDict(MutableMapping):
+    """A sorted mapping for numeric keys, backed by typed arrays.
+
+    It offers the ordered features of TreeDict - range retrieval with slices,
+    `get_closest_keys` and in-order iteration - but instead of one node object
+    per key, keys are kept in `array.array` chunks of up to `chunk_size` items,
+    and all searches are made with `bisect`. Values live in plain lists
+    parallel to the key chunks.
+
+    The `typecode` argument is passed to `array.array`: the default "d" stores
+    keys as floats (so `1` is retrieved back as `1.0`); use "q" for integer keys.
+
+    Memory usage is a small fraction of that of TreeDict, which keeps a
+    full Python object for each node, so this is the class to pick for
+    long series indexed by timestamps or other numbers. No "key" function
+    is supported.
+    """
+
+    def __init__(self, *args, typecode="d", chunk_size=1024):
+        if chunk_size < 2:
+            raise ValueError("chunk_size must be at least 2")
+        self.typecode = typecode
+        self.chunk_size = chunk_size
+        self.clear()
+        if len(args) == 1 and isinstance(args[0], Mapping):
+            args = args[0].items()
+        for key, value in args:
+            self[key] = value
+
+    def clear(self):
+        self._keys = []
+        self._values = []
+        self._maxes = []
+        self._len = 0
+
+    def _bisect(self, key, right=False):
+        """Position of key as a (chunk index, index in chunk) tuple.
+
+        Works like bisect_left (or bisect_right) over the flattened keys:
+        if the key would go past the last key, the returned position is (len(chunks), 0).
+        """
+        bisect = bisect_right if right else bisect_left
+        i = bisect(self._maxes, key)
+        if i == len(self._maxes):
+            return i, 0
+        return i, bisect(self._keys[i], key)
+
+    def _find(self, key):
+        try:
+            i, j = self._bisect(key)
+        except TypeError:
+            raise KeyError(f"{key} type incompatible with other keys in the tree")
+        if i == len(self._keys) or self._keys[i][j] != key:
+            raise KeyError(key)
+        return i, j
+
+    def _previous(self, i, j):
+        if j > 0:
+            return i, j - 1
+        if i > 0:
+            return i - 1, len(self._keys[i - 1]) - 1
+        return None
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._values[i][j] for i, j in self._iter_slice(key)]
+        i, j = self._find(key)
+        return self._values[i][j]
+
+    def __setitem__(self, key, value):
+        if not self._keys:
+            self._keys.append(array(self.typecode, (key,)))
+            self._values.append([value])
+            self._maxes.append(self._keys[0][0])
+            self._len = 1
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        keys = self._keys[i]
+        j = bisect_left(keys, key)
+        if j < len(keys) and keys[j] == key:
+            self._values[i][j] = value
+            return
+        keys.insert(j, key)
+        self._values[i].insert(j, value)
+        self._maxes[i] = keys[-1]
+        self._len += 1
+        if len(keys) > self.chunk_size:
+            half = len(keys) // 2
+            self._keys.insert(i + 1, keys[half:])
+            self._values.insert(i + 1, self._values[i][half:])
+            self._maxes.insert(i + 1, keys[-1])
+            del keys[half:]
+            del self._values[i][half:]
+            self._maxes[i] = keys[-1]
+
+    def __delitem__(self, key):
+        i, j = self._find(key)
+        keys = self._keys[i]
+        del keys[j]
+        del self._values[i][j]
+        self._len -= 1
+        if keys:
+            self._maxes[i] = keys[-1]
+        else:
+            del self._keys[i]
+            del self._values[i]
+            del self._maxes[i]
+
+    def _iter_positions(self, lo, hi, reverse=False):
+        """Yields (chunk, index) positions from lo (inclusive) to hi (exclusive)"""
+        lo_i, lo_j = lo
+        hi_i, hi_j = hi
+        chunks = range(lo_i, min(hi_i + 1, len(self._keys)))
+        for i in reversed(chunks) if reverse else chunks:
+            start = lo_j if i == lo_i else 0
+            stop = hi_j if i == hi_i else len(self._keys[i])
+            indexes = range(start, stop)
+            for j in reversed(indexes) if reverse else indexes:
+                yield i, j
+
+    def _iter_slice(self, slice_):
+        step = slice_.step if slice_.step is not None else 1
+        end = (len(self._keys), 0)
+        if step > 0:
+            lo = self._bisect(slice_.start) if slice_.start is not None else (0, 0)
+            hi = self._bisect(slice_.stop) if slice_.stop is not None else end
+            positions = self._iter_positions(lo, hi)
+        else:
+            # Going backwards: start is the inclusive upper bound, stop the exclusive lower one.
+            lo = (
+                self._bisect(slice_.stop, right=True)
+                if slice_.stop is not None
+                else (0, 0)
+            )
+            hi = (
+                self._bisect(slice_.start, right=True)
+                if slice_.start is not None
+                else end
+            )
+            positions = self._iter_positions(lo, hi, reverse=True)
+        for counter, position in enumerate(positions):
+            if not counter % abs(step):
+                yield position
+
+    def get_closest_keys(self, key):
+        if not self._keys:
+            return None, None
+        i, j = self._bisect(key)
+        higher = self._keys[i][j] if i < len(self._keys) else None
+        if higher == key:
+            return higher, higher
+        previous = self._previous(i, j)
+        lower = self._keys[previous[0]][previous[1]] if previous else None
+        return lower, higher
+
+    def __iter__(self):
+        for keys in self._keys:
+            yield from keys
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({', '.join('%r=%r' % (k, v) for k, v in self.items())})"
@@ -230,5 +230,10 @@ class BlobTextDict(UserDict[K, V]):
 
         return self.blob.get(offset)
 
+    def clear(self):
+        # The blob never re-uses freed areas: start a new one
+        self.data.clear()
+        self.blob = _BlobSets()
+
     def __repr__(self):
         return f"{self.__class__.__name__}({{{', '.join(key + ':' + repr(value) for key, value in self.items())}}})"
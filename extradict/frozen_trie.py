@@ -0,0 +1,633 @@
+"""
+Immutable, compact tries, meant for data which is loaded once
+and then only queried.
+
+The words are compiled into a minimal acyclic automaton (a DAWG):
+besides sharing common prefixes, like any trie, words also share
+common suffixes - "walking" and "talking" end in the same "alking" states.
+The automaton is stored in a few flat arrays, instead of one Python
+object per node.
+
+Frozen tries, and pattern tries, can be saved to a binary file,
+and re-opened with MappedTrie, which answers queries straight from
+the memory-mapped file, without loading it.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Set
+from heapq import heapify, heapreplace
+
+from .trie import (
+    _TrieTraversal,
+    _WORD_END,
+    _paused_gc,
+    _suffix_array,
+    _suffix_range,
+)
+
+# File header: magic, kind, little-endian flag, padding, and three sizes
+_HEADER = struct.Struct("<8sBB6xQQQ")
+_MAGIC = b"XDTRIE\x00\x01"
+_PREFIX_FILE = 0
+_PATTERN_FILE = 1
+# Arrays are written in the machine byte order, characters as UTF-32
+_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+
+
+class _BuildNode:
+    __slots__ = ("children", "final")
+
+    def __init__(self):
+        self.children = {}
+        self.final = False
+
+    def signature(self):
+        # Children are already minimized, so they can be compared by identity
+        return self.final, tuple(
+            (char, id(child)) for char, child in self.children.items()
+        )
+
+
+def _build_automaton(words):
+    """Builds the minimal automaton for sorted, unique words
+
+    Uses the incremental algorithm by Daciuk et al.: as words come in
+    order, the states for the part of the previous word that is not
+    shared with the current one won't change anymore, and can be
+    replaced by an equivalent state already seen.
+    """
+    root = _BuildNode()
+    register = {}
+    unchecked = []  # (parent, char, child) along the path of the last word
+    previous = None
+
+    def minimize(down_to):
+        while len(unchecked) > down_to:
+            parent, char, child = unchecked.pop()
+            signature = child.signature()
+            existing = register.get(signature)
+            if existing is not None:
+                parent.children[char] = existing
+            else:
+                register[signature] = child
+
+    for word in words:
+        if previous is not None and word <= previous:
+            if word == previous:
+                continue
+            raise ValueError("Words must be given in sorted order")
+        common = 0
+        for char_a, char_b in zip(word, previous or ""):
+            if char_a != char_b:
+                break
+            common += 1
+        minimize(common)
+        node = unchecked[-1][2] if unchecked else root
+        for char in word[common:]:
+            child = _BuildNode()
+            node.children[char] = child
+            unchecked.append((node, char, child))
+            node = child
+        node.final = True
+        previous = word
+    minimize(0)
+    return root
+
+
+def _split_by_first_char(words, count):
+    """Splits sorted words into up to count sorted lists, keeping words with the same first character together
+
+    Each group of words goes to the list with the fewest characters so far,
+    the largest groups first. Words out of order are rejected here, as when
+    building in a single process, since the groups would be re-sorted.
+    """
+    groups = {}
+    previous = None
+    for word in words:
+        if previous is not None and word < previous:
+            raise ValueError("Words must be given in sorted order")
+        groups.setdefault(word[:1], []).append(word)
+        previous = word
+    sizes = {first: sum(map(len, group)) for first, group in groups.items()}
+    parts = [(0, i, []) for i in range(count)]
+    heapify(parts)
+    for first in sorted(sizes, key=sizes.__getitem__, reverse=True):
+        size, i, firsts = parts[0]
+        firsts.append(first)
+        heapreplace(parts, (size + sizes[first], i, firsts))
+    return [
+        [word for first in sorted(firsts) for word in groups[first]]
+        for _, _, firsts in parts
+        if firsts
+    ]
+
+
+def _build_part(words):
+    # Pausing the collector here only affects the pool's worker process
+    return FrozenTrie.from_iterable(words, presorted=True, pause_gc=True)
+
+
+class FrozenTrie(_TrieTraversal, Set):
+    """An immutable prefix-based Trie for strings with a Set interface
+
+    use "FrozenTrie[prefix].contents" to retrieve a set of all strings with the
+    given prefix, "len(FrozenTrie[prefix])" to count them,
+    and "FrozenTrie.iter_prefix(prefix, limit)" to lazily retrieve them in order.
+
+    Create it with "FrozenTrie(words)" or by calling ".freeze()" on a
+    mutable trie. The data is compiled into a minimal automaton, in which
+    words share both common prefixes and common suffixes, stored in flat arrays:
+    it takes several times less memory than the mutable tries, and,
+    as it can't change, queries need no locks.
+    """
+
+    def __init__(self, initial=(), *, pattern=""):
+        self._compile(_build_automaton(sorted(set(initial))))
+        self.pattern = pattern
+
+    @classmethod
+    def from_iterable(cls, words, presorted=False, processes=1, *, pause_gc=False):
+        """Builds a FrozenTrie from words, which can be given in sorted order as a stream
+
+        With presorted=True, words - like the lines of a sorted word list -
+        are compiled as they come, without being collected in memory first.
+
+        With processes other than 1 (None for one per CPU), words are split
+        by their first character, and the automaton for each part is built in
+        a ProcessPoolExecutor. The parts are joined under a common root
+        by concatenating their arrays: they don't share suffix states with each
+        other, so the result is a little larger than a single minimal automaton.
+
+        With pause_gc=True, the cyclic garbage collector is disabled - for the
+        whole process - while the automaton is compiled. The worker processes
+        always build their parts with it paused.
+        """
+        if processes == 1:
+            trie = cls.__new__(cls)
+            with _paused_gc(pause_gc):
+                trie._compile(_build_automaton(words if presorted else sorted(words)))
+            trie.pattern = ""
+            return trie
+        from concurrent.futures import ProcessPoolExecutor
+
+        parts = _split_by_first_char(
+            words if presorted else sorted(words), processes or os.cpu_count()
+        )
+        with ProcessPoolExecutor(processes) as executor:
+            return cls._join(list(executor.map(_build_part, parts)))
+
+    @classmethod
+    def _join(cls, parts):
+        """Lays out tries for words with distinct first characters as a single trie
+
+        The roots are merged into a new root, and the other states of each part
+        follow it in turn, keeping their order, with their numbers
+        and edge positions shifted past the ones already laid out.
+        """
+        root_edges = []
+        labels, targets, counts, finals = [], array("I"), array("I", [0]), [b"\0"]
+        first = array("I", [0])
+        state_offset = 1
+        edge_offsets = []
+        for part in parts:
+            root_end = part.first[1]
+            shift = state_offset - 1
+            root_edges.extend(
+                (part.labels[edge], part.targets[edge] + shift)
+                for edge in range(root_end)
+            )
+            edge_offsets.append(len(targets) - root_end)
+            labels.append(part.labels[root_end:])
+            targets.extend(map(shift.__add__, part.targets[root_end:]))
+            counts[0] += part.counts[0]
+            counts.extend(part.counts[1:])
+            if part.finals[0]:
+                finals[0] = b"\1"
+            finals.append(part.finals[1:])
+            state_offset += len(part.finals) - 1
+        root_edges.sort()
+        for part, edge_offset in zip(parts, edge_offsets):
+            first.extend(map((edge_offset + len(root_edges)).__add__, part.first[1:-1]))
+        first.append(len(targets) + len(root_edges))
+        trie = cls.__new__(cls)
+        trie.labels = "".join(char for char, _ in root_edges) + "".join(labels)
+        trie.targets = array("I", [target for _, target in root_edges]) + targets
+        trie.first = first
+        trie.counts = counts
+        trie.finals = b"".join(finals)
+        trie.pattern = ""
+        return trie
+
+    def _compile(self, root):
+        """Numbers the states and lays them out in flat arrays
+
+        States are numbered in reverse post-order, so that all states
+        come before the ones reachable from them.
+        """
+        visited = {id(root)}
+        post_order = []
+        stack = [(root, iter(root.children.values()))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if id(child) not in visited:
+                    visited.add(id(child))
+                    stack.append((child, iter(child.children.values())))
+                    break
+            else:
+                stack.pop()
+                post_order.append(node)
+        order = post_order[::-1]
+        numbers = {id(node): number for number, node in enumerate(order)}
+        first = array("I", [0])
+        targets = array("I")
+        labels = []
+        for node in order:
+            for char, child in node.children.items():
+                labels.append(char)
+                targets.append(numbers[id(child)])
+            first.append(len(targets))
+        # Count the words reachable from each state, from the last state up
+        counts = array("I", bytes(4 * len(order)))
+        for state in range(len(order) - 1, -1, -1):
+            total = order[state].final
+            for edge in range(first[state], first[state + 1]):
+                total += counts[targets[edge]]
+            counts[state] = total
+        self.labels = "".join(labels)
+        self.first = first
+        self.targets = targets
+        self.finals = bytes(node.final for node in order)
+        self.counts = counts
+
+    def _clone(self):
+        new = self.__class__.__new__(self.__class__)
+        new.labels = self.labels
+        new.first = self.first
+        new.targets = self.targets
+        new.finals = self.finals
+        new.counts = self.counts
+        new.pattern = self.pattern
+        return new
+
+    def __getitem__(self, key):
+        sub_instance = self._clone()
+        sub_instance.pattern = self.pattern + key
+        return sub_instance
+
+    def _state(self, text):
+        state = 0
+        labels, first, targets = self.labels, self.first, self.targets
+        for char in text:
+            edge = labels.find(char, first[state], first[state + 1])
+            if edge < 0:
+                return None
+            state = targets[edge]
+        return state
+
+    def _start(self, text):
+        state = self._state(text)
+        return None if state is None else (text, state)
+
+    def _edges(self, state):
+        text, state = state
+        labels, targets = self.labels, self.targets
+        return [
+            (text + labels[edge], targets[edge])
+            for edge in range(self.first[state], self.first[state + 1])
+        ]
+
+    def _words(self, state):
+        return (state[0],) if self.finals[state[1]] else ()
+
+    def _walk_depth_first(self, state):
+        # Same as the generic walk, with the arrays inlined: this is the hot path
+        labels, first, targets, finals = (
+            self.labels,
+            self.first,
+            self.targets,
+            self.finals,
+        )
+        stack = [state]
+        pop, push = stack.pop, stack.append
+        while stack:
+            text, state = pop()
+            if finals[state]:
+                yield text
+            for edge in range(first[state + 1] - 1, first[state] - 1, -1):
+                push((text + labels[edge], targets[edge]))
+
+    def prefixes_of(self, text):
+        """Lazily yields the words in this trie which are prefixes of text, shortest first"""
+        if not text.startswith(self.pattern):
+            return
+        labels, first, targets, finals = (
+            self.labels,
+            self.first,
+            self.targets,
+            self.finals,
+        )
+        minimum = len(self.pattern)
+        state = 0
+        for i, char in enumerate(text):
+            if finals[state] and i >= minimum:
+                yield text[:i]
+            edge = labels.find(char, first[state], first[state + 1])
+            if edge < 0:
+                return
+            state = targets[edge]
+        if finals[state]:
+            yield text
+
+    @property
+    def contents(self):
+        return set(self)
+
+    def freeze(self):
+        return self
+
+    def save(self, path):
+        """Writes the trie to a binary file, which can be opened with MappedTrie"""
+        if self.pattern:
+            return FrozenTrie(self).save(path)
+        _write_file(
+            path,
+            _PREFIX_FILE,
+            (len(self.finals), len(self.targets), 0),
+            [
+                self.first,
+                self.targets,
+                self.counts,
+                self.finals,
+                self.labels.encode(_UTF32),
+            ],
+        )
+
+    def copy(self):
+        return self
+
+    def __copy__(self):
+        return self
+
+    def __contains__(self, key):
+        if not key.startswith(self.pattern):
+            return False
+        state = self._state(key)
+        return state is not None and bool(self.finals[state])
+
+    def __iter__(self):
+        return self.iter_prefix()
+
+    def __len__(self):
+        state = self._state(self.pattern)
+        return 0 if state is None else self.counts[state]
+
+    __hash__ = Set._hash
+
+    def __repr__(self):
+        return f"FrozenTrie {('prefixed with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
+
+
+def _write_file(path, kind, sizes, sections):
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, kind, sys.byteorder == "little", *sizes))
+        for section in sections:
+            data = memoryview(section).cast("B")
+            file.write(data)
+            # Keep every section aligned
+            file.write(bytes(-data.nbytes % 8))
+
+
+def _write_pattern_file(path, words):
+    """Writes words in the file format for pattern queries
+
+    That is a single text with all words, each one preceded and followed
+    by _WORD_END, the suffix array over it, and the start position of each word.
+    """
+    text = _WORD_END + "".join(word + _WORD_END for word in words)
+    starts = array("I")
+    position = 1
+    for word in words:
+        starts.append(position)
+        position += len(word) + 1
+    starts.append(position)
+    _write_file(
+        path,
+        _PATTERN_FILE,
+        (len(words), len(text), 0),
+        [starts, array("I", _suffix_array(text)), text.encode(_UTF32)],
+    )
+
+
+def _read_header(header):
+    magic, kind, little_endian, *sizes = _HEADER.unpack(header)
+    if magic != _MAGIC:
+        raise ValueError("Not a trie file")
+    if bool(little_endian) != (sys.byteorder == "little"):
+        raise ValueError("Trie file was written on a machine with other byte order")
+    return kind, sizes
+
+
+class _MappedText:
+    """UTF-32 text in a memory-mapped file, searched in place
+
+    It stands for the edge labels of a prefix file, or the text of a pattern
+    file: only the characters and slices asked for are decoded, so the text
+    is never copied out of the shared memory map.
+    """
+
+    def __init__(self, codes):
+        # The code points, as the file is written in the machine's byte order
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return chr(self.codes[index])
+        start, stop, _ = index.indices(len(self))
+        return str(self.codes[start : max(start, stop)], _UTF32)
+
+    def find(self, char, start, stop):
+        try:
+            return self.codes[start:stop].tolist().index(ord(char)) + start
+        except ValueError:
+            return -1
+
+    def encode(self, encoding):
+        return self[:].encode(encoding)
+
+
+class MappedTrie:
+    """A read-only trie answering queries straight from a memory-mapped file
+
+    Files are created by the ".save(path)" method of the tries. Those
+    saved from FrozenTrie or the prefix tries open as a MappedPrefixTrie,
+    with the FrozenTrie interface; those saved from PatternCharTrie or
+    SuffixArrayTrie open as a MappedPatternTrie, matching patterns anywhere
+    in the words.
+
+    Opening copies nothing: characters are decoded only as queries reach
+    them, and the pages of a file opened by several processes are shared
+    by the operating system.
+    Use "close()", or a "with" block, to release the file.
+    """
+
+    def __new__(cls, path=None, *, pattern=""):
+        if cls is MappedTrie:
+            with open(path, "rb") as file:
+                kind, _ = _read_header(file.read(_HEADER.size))
+            cls = MappedPrefixTrie if kind == _PREFIX_FILE else MappedPatternTrie
+        return object.__new__(cls)
+
+    def __init__(self, path, *, pattern=""):
+        self.path = os.fspath(path)
+        self.pattern = pattern
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        kind, sizes = _read_header(self._mmap[: _HEADER.size])
+        if kind != self._kind:
+            self._mmap.close()
+            raise ValueError(f"{self.path} can't be opened as a {type(self).__name__}")
+        self._views = [memoryview(self._mmap)]
+        self._load(*sizes)
+
+    def _sections(self, *sizes):
+        offset = _HEADER.size
+        sections = []
+        for size in sizes:
+            section = self._views[0][offset : offset + size]
+            self._views.append(section)
+            sections.append(section)
+            offset += size + (-size % 8)
+        return sections
+
+    def _array(self, section):
+        result = section.cast("I")
+        self._views.append(result)
+        return result
+
+    def _clone(self):
+        new = super()._clone()
+        new.path = self.path
+        new._mmap = self._mmap
+        new._views = self._views
+        return new
+
+    def close(self):
+        """Releases the mapped file: this instance and its views can't be used anymore"""
+        # Memoryviews derived from others have to be released first
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __reduce__(self):
+        # Other processes re-open the file, and share its pages
+        return MappedTrie, (self.path,), {"pattern": self.pattern}
+
+
+class MappedPrefixTrie(MappedTrie, FrozenTrie):
+    """A FrozenTrie whose arrays live in a memory-mapped file. Open it with MappedTrie."""
+
+    _kind = _PREFIX_FILE
+
+    def _load(self, states, edges, _):
+        first, targets, counts, finals, labels = self._sections(
+            (states + 1) * 4, edges * 4, states * 4, states, edges * 4
+        )
+        self.first = self._array(first)
+        self.targets = self._array(targets)
+        self.counts = self._array(counts)
+        self.finals = finals
+        self.labels = _MappedText(self._array(labels))
+
+    def __repr__(self):
+        return f"MappedPrefixTrie {('prefixed with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
+
+
+class MappedPatternTrie(MappedTrie, Set):
+    """A pattern-based, read-only trie over a memory-mapped file. Open it with MappedTrie.
+
+    "MappedPatternTrie[pattern].contents" is the set of all strings
+    containing pattern, as in SuffixArrayTrie.
+    """
+
+    _kind = _PATTERN_FILE
+
+    def _load(self, words, text_size, _):
+        starts, suffixes, text = self._sections(
+            (words + 1) * 4, text_size * 4, text_size * 4
+        )
+        self.size = words
+        self.starts = self._array(starts)
+        self.suffixes = self._array(suffixes)
+        self.text = _MappedText(self._array(text))
+
+    def _clone(self):
+        new = self.__class__.__new__(self.__class__)
+        for name in ("pattern", "size", "starts", "suffixes", "text"):
+            setattr(new, name, getattr(self, name))
+        new.path = self.path
+        new._mmap = self._mmap
+        new._views = self._views
+        return new
+
+    def __getitem__(self, key):
+        sub_instance = self._clone()
+        sub_instance.pattern = self.pattern + key
+        return sub_instance
+
+    def _word(self, word_id):
+        return self.text[self.starts[word_id] : self.starts[word_id + 1] - 1]
+
+    def _ids(self, pattern):
+        start, stop = _suffix_range(self.text, self.suffixes, pattern)
+        return {
+            bisect_right(self.starts, self.suffixes[index]) - 1
+            for index in range(start, stop)
+        }
+
+    @property
+    def contents(self):
+        return set(self)
+
+    def save(self, path):
+        _write_pattern_file(path, list(self))
+
+    def __contains__(self, key):
+        if self.pattern not in key or _WORD_END in key:
+            return False
+        start, stop = _suffix_range(
+            self.text, self.suffixes, _WORD_END + key + _WORD_END
+        )
+        return stop > start
+
+    def __iter__(self):
+        if not self.pattern:
+            return (self._word(word_id) for word_id in range(self.size))
+        return (self._word(word_id) for word_id in sorted(self._ids(self.pattern)))
+
+    def __len__(self):
+        if not self.pattern:
+            return self.size
+        return len(self._ids(self.pattern))
+
+    __hash__ = Set._hash
+
+    def __repr__(self):
+        return f"MappedPatternTrie {('patterned with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
+
+
+__all__ = ["FrozenTrie", "MappedTrie"]
@@ -1,5 +1,11 @@
-from collections.abc import MutableSet
-from copy import copy
+import gc
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, MutableSet
+from contextlib import contextmanager
+from copy import copy, deepcopy
+from heapq import heappop, heappush
+from itertools import islice
 from threading import RLock
 
 from .blobdict import BlobTextDict
@@ -11,7 +17,339 @@ _WORD_END = "\ufffe"
 _ENTRY_END = "\uffff"
 
 
-class PrefixCharTrie(MutableSet):
+@contextmanager
+def _paused_gc(pause):
+    """Pauses the cyclic garbage collector while building tries in bulk, if pause is true
+
+    Bulk loads create hundreds of thousands of sets, none of them part of
+    a reference cycle, and each allocation burst would trigger collections
+    scanning all of them again.
+    The collector is switched off for the whole process, so cycles created by
+    other threads meanwhile are not collected either: it is only done where
+    asked for, with the pause_gc argument of the bulk loaders.
+    """
+    enabled = pause and gc.isenabled()
+    if enabled:
+        gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _parse_glob(glob, normalize=None):
+    """Splits a shell-style wildcard pattern into tokens, following the rules of fnmatch
+
+    Tokens are None for "*", a single character standing for itself,
+    or a (negated, characters, ranges) class for "?" and "[...]".
+    normalize, if given, is applied to the literal text and class members.
+    """
+    tokens = []
+    literal = []
+
+    def flush():
+        text = "".join(literal)
+        tokens.extend(normalize(text) if normalize else text)
+        literal.clear()
+
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        i += 1
+        if char == "*":
+            flush()
+            if not tokens or tokens[-1] is not None:
+                tokens.append(None)
+        elif char == "?":
+            flush()
+            tokens.append((True, frozenset(), ()))
+        elif char == "[":
+            end = i + (glob[i : i + 1] == "!")
+            end = glob.find("]", end + (glob[end : end + 1] == "]"))
+            if end < 0:
+                literal.append(char)
+                continue
+            body, i = glob[i:end], end + 1
+            negated = body.startswith("!")
+            if negated:
+                body = body[1:]
+            members, ranges = set(), []
+            j = 0
+            while j < len(body):
+                if j + 2 < len(body) and body[j + 1] == "-":
+                    ranges.append((body[j], body[j + 2]))
+                    j += 3
+                else:
+                    members.add(body[j])
+                    j += 1
+            if normalize:
+                members = {normalize(member) for member in members}
+                ranges = [(normalize(low), normalize(high)) for low, high in ranges]
+                members = {member for member in members if len(member) == 1}
+                ranges = [item for item in ranges if len(item[0]) == len(item[1]) == 1]
+            flush()
+            tokens.append((negated, frozenset(members), tuple(ranges)))
+        else:
+            literal.append(char)
+    flush()
+    return tokens
+
+
+class _Glob:
+    """A tokenized wildcard pattern, matched one character at a time
+
+    The position after the text seen so far is kept as the tuple of
+    tokens which could come next: a non-deterministic automaton, whose
+    steps are cached, so that sibling branches of a trie share the work.
+    Wildcards and classes never match the sentinel characters.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self._steps = {}
+        self.initial = self._closure({0})
+
+    @property
+    def literal_prefix(self):
+        """The text any match must start with"""
+        prefix = []
+        for token in self.tokens:
+            if not isinstance(token, str):
+                break
+            prefix.append(token)
+        return "".join(prefix)
+
+    def longest_literal(self):
+        """The index of the longest run of literal tokens, and its text"""
+        best = (0, "")
+        run_start = 0
+        for i, token in enumerate(self.tokens + [None]):
+            if isinstance(token, str):
+                continue
+            if i - run_start > len(best[1]):
+                best = (run_start, "".join(self.tokens[run_start:i]))
+            run_start = i + 1
+        return best
+
+    def rotated(self, index):
+        """Matches rotations of the words matched by this glob, as stored by PatternCharTrie
+
+        A word spelled "x" + "y", with "y" matching the tokens from index on
+        and "x" the ones before it, is stored as "y" + _WORD_END + "x".
+        """
+        return _Glob(self.tokens[index:] + [_WORD_END] + self.tokens[:index])
+
+    def _closure(self, positions):
+        tokens = self.tokens
+        for position in sorted(positions):
+            while position < len(tokens) and tokens[position] is None:
+                position += 1
+                positions.add(position)
+        return tuple(sorted(positions))
+
+    def _step(self, positions, char):
+        tokens = self.tokens
+        sentinel = char == _WORD_END or char == _ENTRY_END
+        following = set()
+        for position in positions:
+            if position == len(tokens):
+                continue
+            token = tokens[position]
+            if token is None:
+                if not sentinel:
+                    following.add(position)
+            elif isinstance(token, str):
+                if token == char:
+                    following.add(position + 1)
+            elif not sentinel:
+                negated, members, ranges = token
+                if (
+                    char in members or any(low <= char <= high for low, high in ranges)
+                ) != negated:
+                    following.add(position + 1)
+        return self._closure(following)
+
+    def advance(self, positions, chars):
+        """The positions after chars, or an empty tuple if they can't lead to a match"""
+        steps = self._steps
+        for char in chars:
+            if not positions:
+                break
+            key = positions, char
+            if key not in steps:
+                steps[key] = self._step(positions, char)
+            positions = steps[key]
+        return positions
+
+    def accepts(self, positions):
+        return len(self.tokens) in positions
+
+
+class _TrieTraversal:
+    """Walks trie structures without materializing their contents
+
+    Trie classes implement three primitives over "states", which are tuples whose
+    first item is the text spelled on the way from the root to that point:
+
+    - `_start(text)`: the state reached by following text, or None
+    - `_edges(state)`: the child states, in lexicographic order
+    - `_words(state)`: the words ending at state
+    """
+
+    # Set to True when the same word can be reached through more than one path
+    _repeated_words = False
+
+    def iter_prefix(self, prefix="", limit=None, order="lexicographic"):
+        """Lazily yields the words starting with prefix, after this trie's own pattern
+
+        order can be "lexicographic", or "shortest" to yield shorter words first
+        (with ties in lexicographic order). Iteration stops after `limit`
+        words, if given: only the needed part of the trie is visited.
+        """
+        if order not in ("lexicographic", "shortest"):
+            raise ValueError(f"Unknown order {order!r}")
+        state = self._start(self.pattern + prefix)
+        if state is None:
+            return iter(())
+        walk = (
+            self._walk_depth_first if order == "lexicographic" else self._walk_by_length
+        )
+        results = walk(state)
+        if self._repeated_words:
+            results = self._unique(results)
+        return islice(results, limit)
+
+    def _walk_depth_first(self, state):
+        stack = [state]
+        while stack:
+            state = stack.pop()
+            yield from self._words(state)
+            stack.extend(reversed(self._edges(state)))
+
+    def _walk_by_length(self, state):
+        # Sentinels in the text are not part of the word being spelled
+        heap = [(len(state[0]) - (_WORD_END in state[0]), state[0], state)]
+        while heap:
+            *_, state = heappop(heap)
+            yield from self._words(state)
+            for child in self._edges(state):
+                heappush(
+                    heap, (len(child[0]) - (_WORD_END in child[0]), child[0], child)
+                )
+
+    @staticmethod
+    def _unique(words):
+        seen = set()
+        for word in words:
+            if word not in seen:
+                seen.add(word)
+                yield word
+
+    def fuzzy(self, word, max_distance=2):
+        """Finds the words within max_distance edits (insertions, deletions or substitutions) of word
+
+        Returns a list of (word, distance) pairs, closest first. A row of the
+        Levenshtein distance table is carried down each branch of the trie, and
+        branches where all distances in the row exceed max_distance are not walked.
+        """
+        return self._fuzzy(self.pattern, word, max_distance)
+
+    def _fuzzy(self, text, word, max_distance):
+        state = self._start(text)
+        if state is None:
+            return []
+        row = self._distance_row(list(range(len(word) + 1)), word, state[0])
+        stack = [(state, row)] if min(row) <= max_distance else []
+        results = []
+        while stack:
+            state, row = stack.pop()
+            if row[-1] <= max_distance:
+                results.extend((found, row[-1]) for found in self._words(state))
+            for child in self._edges(state):
+                # Edges to sentinels lead to rotated or finished entries
+                child_row = self._distance_row(row, word, child[0][len(state[0]) :])
+                if child_row and min(child_row) <= max_distance:
+                    stack.append((child, child_row))
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+    @staticmethod
+    def _distance_row(row, word, chars):
+        """Advances a row of the Levenshtein table over chars. Returns None at sentinels"""
+        for char in chars:
+            if char == _WORD_END or char == _ENTRY_END:
+                return None
+            previous, row = row, [row[0] + 1]
+            for i, word_char in enumerate(word):
+                row.append(
+                    min(
+                        row[i] + 1,
+                        previous[i + 1] + 1,
+                        previous[i] + (word_char != char),
+                    )
+                )
+        return row
+
+    def match(self, glob):
+        """Finds the words matching a shell-style wildcard pattern, like "c?t*"
+
+        As in `fnmatch`, "*" matches any run of characters, "?" any single
+        character, "[abc]" and "[a-z]" any of the listed characters and "[!abc]"
+        any other. Branches of the trie are walked only while their text can still
+        match the pattern. Returns a list of the words, in lexicographic order.
+        """
+        glob = self._compile_glob(glob)
+        prefix = glob.literal_prefix
+        if not (prefix.startswith(self.pattern) or self.pattern.startswith(prefix)):
+            return []
+        return self._match(max(prefix, self.pattern, key=len), glob)
+
+    def _compile_glob(self, glob):
+        return _Glob(_parse_glob(glob))
+
+    def _match(self, text, glob):
+        state = self._start(text)
+        if state is None:
+            return []
+        positions = glob.advance(glob.initial, state[0])
+        stack = [(state, positions)] if positions else []
+        results = []
+        while stack:
+            state, positions = stack.pop()
+            if glob.accepts(positions):
+                results.extend(self._words(state))
+            for child in reversed(self._edges(state)):
+                child_positions = glob.advance(positions, child[0][len(state[0]) :])
+                if child_positions:
+                    stack.append((child, child_positions))
+        return results
+
+    def longest_prefix_of(self, text, default=None):
+        """The longest word in this trie which is a prefix of text, or default"""
+        result = default
+        for result in self.prefixes_of(text):
+            pass
+        return result
+
+    def scanner(self):
+        """Compiles the words in this trie into an AhoCorasick automaton, to find them in texts"""
+        from .aho_corasick import AhoCorasick
+
+        return AhoCorasick(self.iter_prefix())
+
+    def freeze(self):
+        """Compiles the words in this trie into an immutable and compact FrozenTrie"""
+        from .frozen_trie import FrozenTrie
+
+        return FrozenTrie(self.iter_prefix())
+
+    def save(self, path):
+        """Writes the words in this trie to a binary file, to be opened with MappedTrie"""
+        self.freeze().save(path)
+
+
+class PrefixCharTrie(_TrieTraversal, MutableSet):
     """A prefix-based Trie for strings with a Set interface.
 
     use "CharTrie[prefix].contents" to retrieve a set of all strings with the given prefix
@@ -20,6 +358,13 @@ class PrefixCharTrie(MutableSet):
     data to the parent trie: additions or deletions will reflect on the parent and other siblings.
 
     Use `CharTrie[prefix].copy()` to have an independent data structure.
+
+    The number of words under each prefix is kept up to date on
+    additions and removals, so "len(CharTrie[prefix])" doesn't
+    need to retrieve the contents.
+
+    Use "CharTrie.iter_prefix(prefix, limit)" to lazily retrieve only the first
+    matching words, in lexicographic order or shortest first.
     """
 
     def __init__(self, initial=None, *, root=None, pattern="", backend=None):
@@ -27,6 +372,7 @@ class PrefixCharTrie(MutableSet):
             backend = dict
         self.backend = backend
         self.data = root if root is not None else backend()
+        self.counts = self._count_words() if root is not None else {}
         self.pattern = pattern
         self.lock = RLock()
         if backend is not BlobTextDict and not pattern in self.data:
@@ -38,7 +384,8 @@ class PrefixCharTrie(MutableSet):
     def __getitem__(self, key):
         pattern = self.pattern
         for letter in key:
-            if letter in self.data[pattern]:
+            # Entries for a view's pattern may have been pruned by a discard
+            if letter in self.data.get(pattern, ()):
                 pattern += letter
                 continue
             return self.__class__(backend=self.backend)
@@ -51,10 +398,54 @@ class PrefixCharTrie(MutableSet):
         new = self.__class__.__new__(self.__class__)
         new.backend = self.backend
         new.data = self.data
+        new.counts = self.counts
         new.lock = self.lock
         new.pattern = self.pattern
         return new
 
+    def _stored_words(self):
+        """All words stored in self.data, regardless of this instance's pattern"""
+        return [key[:-1] for key in self.data if key.endswith(_WORD_END)]
+
+    def _count_words(self):
+        """Rebuilds the per-prefix word counts from the words stored in self.data
+
+        The counts are keyed by the same string objects as self.data, so that
+        the prefixes are not stored twice.
+        """
+        counts = dict.fromkeys(
+            (key for key in self.data if not key.endswith(_WORD_END)), 0
+        )
+        for word in self._stored_words():
+            for i in range(len(word) + 1):
+                prefix = word[:i]
+                counts[prefix] = counts.get(prefix, 0) + 1
+        return {prefix: count for prefix, count in counts.items() if count}
+
+    def _change_counts(self, word, delta):
+        counts = self.counts
+        for i in range(len(word) + 1):
+            prefix = word[:i]
+            count = counts.get(prefix, 0) + delta
+            if count:
+                counts[prefix] = count
+            else:
+                del counts[prefix]
+
+    def _start(self, text):
+        return (text,) if text in self.data else None
+
+    def _edges(self, state):
+        text = state[0]
+        return [
+            (text + letter,)
+            for letter in sorted(self.data[text])
+            if letter != _WORD_END
+        ]
+
+    def _words(self, state):
+        return state if _WORD_END in self.data[state[0]] else ()
+
     @property
     def contents(self):
         return self._contents(self.pattern)
@@ -75,17 +466,129 @@ class PrefixCharTrie(MutableSet):
     def add(self, key):
         if _ENTRY_END in key or _WORD_END in key:
             raise ValueError("Invalid character in key")
-        key = key + _WORD_END
         with self.lock:
-            pattern = self.pattern
-            for letter in key:
-                if self.backend is not BlobTextDict:
-                    branch = self.data.setdefault(pattern, set())
-                else:
-                    branch = self.data[pattern]
-                pattern = pattern + letter
-                branch.add(letter)
-            self.data[pattern] = _WORD_END
+            self._add_word(self.pattern + key)
+
+    def _add_word(self, word):
+        if __class__.__contains__(self, word):
+            return
+        counts = self.counts
+        pattern = ""
+        for letter in word + _WORD_END:
+            if self.backend is not BlobTextDict:
+                branch = self.data.setdefault(pattern, set())
+            else:
+                branch = self.data[pattern]
+            # Counted under the string object just used as the self.data key
+            counts[pattern] = counts.get(pattern, 0) + 1
+            pattern = pattern + letter
+            branch.add(letter)
+        self.data[pattern] = _WORD_END
+
+    def _prune(self, pattern):
+        """Removes the entries which no longer lead to any word, from pattern up"""
+        while pattern and not self.data[pattern]:
+            del self.data[pattern]
+            pattern, letter = pattern[:-1], pattern[-1]
+            self.data[pattern].discard(letter)
+
+    def vacuum(self):
+        """Rebuilds the data shared by this trie and its views, releasing unused memory
+
+        Mappings and sets don't give back memory as their items are removed:
+        after a large part of the words is discarded, this will re-create
+        them with just the needed size.
+        """
+        with self.lock:
+            words = self._stored_words()
+            self.data.clear()
+            self.counts.clear()
+            if self.backend is not BlobTextDict:
+                self.data[""] = set()
+            self._load(words, presorted=False)
+
+    @classmethod
+    def from_iterable(cls, words, presorted=False, *, pause_gc=False):
+        """Builds a trie with words in bulk, faster than adding them one by one
+
+        Words are inserted in lexicographic order, so that the entries for the
+        prefix shared with the previous word are not visited again.
+        If words are already sorted - like the lines of a sorted word list -
+        pass presorted=True, and they are consumed as a stream, without being
+        collected in memory first.
+        With pause_gc=True, the cyclic garbage collector is disabled - for the
+        whole process, not only this thread - until the trie is built, which
+        spares it from repeatedly scanning the new entries.
+        """
+        trie = cls()
+        with trie.lock, _paused_gc(pause_gc):
+            trie._load(words, presorted)
+        return trie
+
+    def _load(self, words, presorted):
+        """Adds words to the emptied data, keeping the word counts for each prefix"""
+        if self.backend is BlobTextDict:
+            for word in words:
+                self._add_word(word)
+            return
+        data, counts = self.data, self.counts
+        # Words under each prefix of the previous word, by prefix length,
+        # added to the count of the shorter prefix once it is left behind
+        pending = [0]
+        prefixes = [""]
+        for word, common, path in self._insert_sorted(
+            words if presorted else sorted(words), _WORD_END
+        ):
+            for length in range(len(pending) - 1, common, -1):
+                count = pending.pop()
+                counts[prefixes[length]] = count
+                pending[-1] += count
+            pending.extend([0] * (len(word) + 1 - len(pending)))
+            pending[-1] += 1
+            data[word + _WORD_END] = _WORD_END
+            prefixes = path
+        for length in range(len(pending) - 1, -1, -1):
+            count = pending.pop()
+            if count:
+                counts[prefixes[length]] = count
+                if pending:
+                    pending[-1] += count
+
+    def _insert_sorted(self, entries, end):
+        """Inserts sorted entries, each followed by end, yielding (entry, shared prefix length, path)
+
+        As entries come in order, the ones sharing the first characters of an
+        entry with any earlier one also share them with the previous entry:
+        only the branches past that shared prefix have to be created.
+        path is a new list with the keys of self.data for each prefix of
+        entry, by length, so that they can be reused instead of sliced again.
+        """
+        data = self.data
+        previous = None
+        path = [""]
+        for entry in entries:
+            if entry == previous:
+                continue
+            if _ENTRY_END in entry or (_WORD_END in entry and end == _WORD_END):
+                raise ValueError("Invalid character in key")
+            if previous is None:
+                common = 0
+            elif entry < previous:
+                raise ValueError(f"Words are not sorted: {entry!r} after {previous!r}")
+            else:
+                common = 0
+                limit = min(len(entry), len(previous))
+                while common < limit and entry[common] == previous[common]:
+                    common += 1
+            spelled = entry + end
+            path = path[: common + 1]
+            data[path[common]].add(spelled[common])
+            for length in range(common + 1, len(entry) + 1):
+                prefix = entry[:length]
+                data[prefix] = {spelled[length]}
+                path.append(prefix)
+            previous = entry
+            yield entry, common, path
 
     def copy(self):
         cls = type(self)
@@ -99,22 +602,45 @@ class PrefixCharTrie(MutableSet):
         return self.data.get(key + _WORD_END, None) == _WORD_END
 
     def discard(self, key):
-        # FIXME: this removes the complete key, but various "unfinshed prefixes"
-        # that would lead to the discarded key remain in self.data
         if key + _WORD_END not in self.data:
             raise KeyError()
-        del self.data[key + _WORD_END]
-        self.data[key].remove(_WORD_END)
+        with self.lock:
+            del self.data[key + _WORD_END]
+            self.data[key].remove(_WORD_END)
+            self._change_counts(key, -1)
+            self._prune(key)
 
     def update(self, seq):
         for item in seq:
             self.add(item)
 
+    def prefixes_of(self, text):
+        """Lazily yields the words in this trie which are prefixes of text, shortest first
+
+        Text is walked once through the trie: one lookup for each character.
+        """
+        if not text.startswith(self.pattern):
+            return
+        for word in self._walk_text(text, _WORD_END):
+            if len(word) >= len(self.pattern):
+                yield word
+
+    def _walk_text(self, text, marker):
+        """Yields the prefixes of text whose entries hold marker, until text leaves the trie"""
+        data = self.data
+        for end in range(len(text) + 1):
+            prefix = text[:end]
+            branch = data.get(prefix)
+            if branch is None:
+                return
+            if marker in branch:
+                yield prefix
+
     def __iter__(self):
-        yield from iter(self.contents)
+        return self.iter_prefix()
 
     def __len__(self):
-        return len(self.contents)
+        return self.counts.get(self.pattern, 0)
 
     def __repr__(self):
         return f"Trie {('prefixed with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
@@ -129,8 +655,35 @@ class PatternCharTrie(PrefixCharTrie):
     data to the parent trie: additions or deletions will reflect on the parent and other siblings.
 
     Use `PatternCharTrie[prefix].copy()` to have an independent data structure.
+
+    Only the total number of words is tracked: "len(PatternCharTrie[pattern])"
+    has to retrieve the matching contents.
+
+    "PatternCharTrie.iter_prefix" yields the words containing the pattern,
+    ordered by the text following the pattern in each word.
     """
 
+    _repeated_words = True
+
+    def _stored_words(self):
+        # Each word is stored once without a rotation, ending in _ENTRY_END
+        return [
+            key
+            for key, branch in self.data.items()
+            if _WORD_END not in key and _ENTRY_END in branch
+        ]
+
+    def _count_words(self):
+        total = len(self._stored_words())
+        return {"": total} if total else {}
+
+    def _change_counts(self, word, delta):
+        total = self.counts.get("", 0) + delta
+        if total:
+            self.counts[""] = total
+        else:
+            self.counts.pop("", None)
+
     def _subpattern_add(self, key):
         if len(key) < 2:
             return
@@ -150,10 +703,42 @@ class PatternCharTrie(PrefixCharTrie):
             )
 
         with self.lock:
-            for i in range(len(key)):
-                self._subpattern_add(
-                    key[i:] + (_WORD_END + key[:i] if i else "") + _ENTRY_END
-                )
+            self._add_word(key)
+
+    def _add_word(self, word):
+        # The empty word has no rotations to be stored in
+        if not word or __class__.__contains__(self, word):
+            return
+        self._change_counts(word, 1)
+        for i in range(len(word)):
+            self._subpattern_add(
+                word[i:] + (_WORD_END + word[:i] if i else "") + _ENTRY_END
+            )
+
+    def _load(self, words, presorted):
+        # Rotations have to be sorted anyway
+        words = {word for word in words if word}
+        if any(_ENTRY_END in word or _WORD_END in word for word in words):
+            raise ValueError("Invalid character in key")
+        rotations = sorted(
+            word[i:] + (_WORD_END + word[:i] if i else "")
+            for word in words
+            for i in range(len(word))
+        )
+        for _ in self._insert_sorted(rotations, _ENTRY_END):
+            pass
+        self._change_counts("", len(words))
+
+    def _edges(self, state):
+        text = state[0]
+        return [
+            (text + letter,)
+            for letter in sorted(self.data[text])
+            if letter != _ENTRY_END
+        ]
+
+    def _words(self, state):
+        return (self._demangle(state[0]),) if _ENTRY_END in self.data[state[0]] else ()
 
     def _demangle(self, word):
         if not _WORD_END in word:
@@ -178,23 +763,12 @@ class PatternCharTrie(PrefixCharTrie):
         if key not in self and not self._deleting_guard(key):
             raise KeyError(f"No item corresponding to {key}")
         with self.lock:
-            for i, letter in enumerate(key):
-                # root = self.data[""]
-                partial = letter
-                paths = {
-                    partial,
-                }
-                for j, next_letter in enumerate(
-                    key[i + 1 :] + (_WORD_END if i > 0 else "") + key[0:i]
-                ):
-                    partial += next_letter
-                    paths.add(partial)
-                self.data[partial].remove(_ENTRY_END)
-
-                # trying to remove the "fossils" that led to the
-                # removed entry is very hard, if these
-                # are used by more words.
-                # we just leave them there!
+            for i in range(len(key)):
+                rotation = key[i:] + (_WORD_END + key[:i] if i else "")
+                self.data[rotation].remove(_ENTRY_END)
+                # Entries shared with other words still have other letters in their sets
+                self._prune(rotation)
+            self._change_counts(key, -1)
 
     def __contains__(self, key):
         return _ENTRY_END in self.data.get(key, set())
@@ -202,6 +776,79 @@ class PatternCharTrie(PrefixCharTrie):
     def _deleting_guard(self, key):
         return False
 
+    def freeze(self):
+        raise TypeError(
+            "Only prefix based tries can be frozen: FrozenTrie can't search patterns"
+        )
+
+    def prefixes_of(self, text):
+        """Lazily yields the words containing this trie's pattern which are prefixes of text"""
+        # Words are found along the entries which are not rotations
+        pattern = self.pattern
+        for word in self._walk_text(text, _ENTRY_END):
+            if pattern in word:
+                yield word
+
+    def match(self, glob):
+        """Finds the words containing this trie's pattern which match a wildcard pattern
+
+        The search starts from the entries for the longest literal text in glob,
+        so that "*ab?d*" only walks the rotations of the words containing "ab".
+        """
+        glob = self._compile_glob(glob)
+        index, seed = glob.longest_literal()
+        if not seed or seed == glob.literal_prefix:
+            # Patterns anchored at the start are walked along the words themselves
+            results = self._match(glob.literal_prefix, glob)
+        else:
+            results = self._match_rotations(seed, glob.rotated(index))
+        return [word for word in results if self.pattern in word]
+
+    def _match_rotations(self, seed, glob):
+        state = self._start(seed)
+        if state is None:
+            return []
+        data = self.data
+        results = set()
+        stack = [(state, glob.advance(glob.initial, seed))]
+        while stack:
+            state, positions = stack.pop()
+            text = state[0]
+            if _ENTRY_END in data[text]:
+                # An entry without the separator is a word with the seed at its start
+                end = (
+                    positions
+                    if _WORD_END in text
+                    else glob.advance(positions, _WORD_END)
+                )
+                if glob.accepts(end):
+                    results.update(self._words(state))
+            for child in self._edges(state):
+                child_positions = glob.advance(positions, child[0][len(text) :])
+                if child_positions:
+                    stack.append((child, child_positions))
+        return sorted(results)
+
+    def fuzzy(self, word, max_distance=2):
+        """Finds the words containing this trie's pattern within max_distance edits of word
+
+        Returns a list of (word, distance) pairs, closest first.
+        """
+        # Only entries which are not rotations are walked, starting from the root
+        results = self._fuzzy("", word, max_distance)
+        return [item for item in results if self.pattern in item[0]]
+
+    def save(self, path):
+        """Writes the words in this trie to a binary file, to be opened with MappedTrie"""
+        from .frozen_trie import _write_pattern_file
+
+        _write_pattern_file(path, list(self))
+
+    def __len__(self):
+        if not self.pattern:
+            return self.counts.get("", 0)
+        return len(self.contents)
+
     def __repr__(self):
         return f"PatternTrie {('patterned with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
 
@@ -214,6 +861,11 @@ class NormalizedTrie(PatternCharTrie):
     def __contains__(self, key):
         return key in self.normalized.literal
 
+    def __len__(self):
+        if not self.pattern:
+            return len(self.normalized)
+        return len(self.contents)
+
     def add(self, key):
         self.normalized[key] = key
         new_key = self.normalized.normalize(key)
@@ -245,6 +897,16 @@ class NormalizedTrie(PatternCharTrie):
     def _expand(self, pattern):
         return self.normalized.get_multi(pattern)
 
+    def _start(self, text):
+        return super()._start(self.normalized.normalize(text))
+
+    def _words(self, state):
+        return [
+            word
+            for norm_key in super()._words(state)
+            for word in sorted(self._expand(norm_key))
+        ]
+
     def discard(self, key):
         with self.lock:
             del self.normalized[key]
@@ -257,12 +919,601 @@ class NormalizedTrie(PatternCharTrie):
     def _deleting_guard(self, key):
         return getattr(self, "_deleting_key", None) == key
 
+    def save(self, path):
+        raise TypeError("The normalization of NormalizedTrie can't be saved")
+
+    def prefixes_of(self, text):
+        """Lazily yields the words which are prefixes of text, ignoring accents and punctuation"""
+        for norm_key in super().prefixes_of(self.normalized.normalize(text)):
+            yield from sorted(self._expand(norm_key))
+
+    @classmethod
+    def from_iterable(cls, words, presorted=False, *, pause_gc=False):
+        """Builds a NormalizedTrie with words in bulk, faster than adding them one by one"""
+        trie = cls()
+        normalize = trie.normalized.normalize
+        with trie.lock, _paused_gc(pause_gc):
+            keys = set()
+            for word in words:
+                trie.normalized[word] = word
+                keys.add(normalize(word))
+            trie._load(keys, presorted=False)
+        return trie
+
+    def _compile_glob(self, glob):
+        return _Glob(_parse_glob(glob, self.normalized.normalize))
+
+    def fuzzy(self, word, max_distance=2):
+        """Finds the words within max_distance edits of word, ignoring accents and punctuation"""
+        return super().fuzzy(self.normalized.normalize(word), max_distance)
+
     @property
     def contents(self):
         return {self.normalized[item] for item in super().contents}
 
 
+class _RadixNode:
+    __slots__ = ("label", "children", "is_word", "count")
+
+    def __init__(self, label, is_word=False, children=None, count=0):
+        self.label = label
+        self.is_word = is_word
+        # Leaf nodes, the majority, don't spend memory with an empty dict
+        self.children = children
+        # Number of words in this subtree
+        self.count = count
+
+    def __deepcopy__(self, memo):
+        return type(self)(
+            self.label,
+            self.is_word,
+            (
+                {char: deepcopy(child) for char, child in self.children.items()}
+                if self.children
+                else None
+            ),
+            self.count,
+        )
+
+
+class RadixTrie(_TrieTraversal, MutableSet):
+    """A path-compressed (radix, or Patricia) prefix Trie with a Set interface.
+
+    Offers the same interface as PrefixCharTrie: use "RadixTrie[prefix].contents"
+    to retrieve a set of all strings with the given prefix, and RadixTrie[prefix]
+    to get another instance **sharing** the same underlying data.
+
+    Instead of storing every prefix of every word as a separate string key,
+    words are kept in a tree of node objects, in which each edge is labeled with
+    a substring, and chains of nodes with a single child are collapsed
+    into a single edge. Memory usage is linear on the size of the stored words,
+    and lookups take a single pass over the searched key.
+    Each node counts the words below it, so "len(RadixTrie[prefix])"
+    only walks down the prefix.
+    """
+
+    node_cls = _RadixNode
+
+    def __init__(self, initial=None, *, root=None, pattern=""):
+        self.root = root if root is not None else self.node_cls("")
+        self.pattern = pattern
+        self.lock = RLock()
+        if initial:
+            self.update(initial)
+
+    def _clone(self):
+        new = self.__class__.__new__(self.__class__)
+        new.root = self.root
+        new.lock = self.lock
+        new.pattern = self.pattern
+        return new
+
+    def __getitem__(self, key):
+        sub_instance = self._clone()
+        sub_instance.pattern = self.pattern + key
+        return sub_instance
+
+    def _find(self, key):
+        """Retrieves the position reached in the trie by key as (node, offset)
+
+        As edges can hold several characters, offset is the number
+        of characters of node.label which were consumed:
+        it is less than len(node.label) if key ends in the middle of an edge.
+        Returns None if key is not a prefix of any stored word.
+        """
+        node = self.root
+        index = 0
+        while index < len(key):
+            child = node.children.get(key[index]) if node.children else None
+            if child is None:
+                return None
+            label = child.label
+            remaining = len(key) - index
+            if remaining < len(label):
+                return (child, remaining) if label.startswith(key[index:]) else None
+            if not key.startswith(label, index):
+                return None
+            index += len(label)
+            node = child
+        return node, len(node.label)
+
+    def _start(self, text):
+        position = self._find(text)
+        if position is None:
+            return None
+        node, offset = position
+        return text[: len(text) - offset] + node.label, node
+
+    def _edges(self, state):
+        text, node = state
+        if not node.children:
+            return ()
+        return [
+            (text + child.label, child) for _, child in sorted(node.children.items())
+        ]
+
+    def _words(self, state):
+        return (state[0],) if state[1].is_word else ()
+
+    @property
+    def contents(self):
+        return set(self)
+
+    def add(self, key):
+        key = self.pattern + key
+        with self.lock:
+            if key in self:
+                return
+            node = self.root
+            node.count += 1
+            index = 0
+            while index < len(key):
+                children = node.children
+                child = children.get(key[index]) if children else None
+                if child is None:
+                    if children is None:
+                        node.children = children = {}
+                    children[key[index]] = self.node_cls(
+                        key[index:], is_word=True, count=1
+                    )
+                    return
+                label = child.label
+                common = 1
+                limit = min(len(label), len(key) - index)
+                while common < limit and label[common] == key[index + common]:
+                    common += 1
+                if common < len(label):
+                    # Split the edge at the point the new key diverges
+                    child.label = label[common:]
+                    child = self.node_cls(
+                        label[:common],
+                        children={label[common]: child},
+                        count=child.count,
+                    )
+                    children[key[index]] = child
+                node = child
+                node.count += 1
+                index += common
+            node.is_word = True
+
+    def discard(self, key):
+        with self.lock:
+            path = [self.root]
+            position = self._find(key) if key.startswith(self.pattern) else None
+            if position is None or position[1] != len(position[0].label):
+                raise KeyError(key)
+            # Rebuild the path from the root, so that nodes can be merged or removed
+            index = 0
+            while index < len(key):
+                node = path[-1].children[key[index]]
+                path.append(node)
+                index += len(node.label)
+            node = path[-1]
+            if not node.is_word:
+                raise KeyError(key)
+            node.is_word = False
+            for path_node in path:
+                path_node.count -= 1
+            parent = path[-2] if len(path) > 1 else None
+            if parent is None:
+                return
+            if not node.children:
+                del parent.children[node.label[0]]
+                if not parent.children:
+                    parent.children = None
+                if parent is not self.root and not parent.is_word:
+                    self._merge_single_child(parent)
+            else:
+                self._merge_single_child(node)
+
+    def _merge_single_child(self, node):
+        if not node.children or len(node.children) != 1:
+            return
+        (child,) = node.children.values()
+        node.label += child.label
+        node.is_word = child.is_word
+        node.children = child.children
+        node.count = child.count
+
+    def update(self, seq):
+        with self.lock:
+            for item in seq:
+                self.add(item)
+
+    def prefixes_of(self, text):
+        """Lazily yields the words in this trie which are prefixes of text, shortest first"""
+        if not text.startswith(self.pattern):
+            return
+        node = self.root
+        index = 0
+        while True:
+            if node.is_word and index >= len(self.pattern):
+                yield text[:index]
+            if index == len(text) or not node.children:
+                return
+            node = node.children.get(text[index])
+            if node is None or not text.startswith(node.label, index):
+                return
+            index += len(node.label)
+
+    def copy(self):
+        cls = type(self)
+        return cls(self.contents)
+
+    def __copy__(self):
+        return type(self)(pattern=self.pattern, root=deepcopy(self.root))
+
+    def __contains__(self, key):
+        if not key.startswith(self.pattern):
+            return False
+        position = self._find(key)
+        return (
+            position is not None
+            and position[1] == len(position[0].label)
+            and position[0].is_word
+        )
+
+    def __iter__(self):
+        return self.iter_prefix()
+
+    def __len__(self):
+        position = self._find(self.pattern)
+        return position[0].count if position is not None else 0
+
+    def __repr__(self):
+        return f"RadixTrie {('prefixed with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
+
+
+class _ScoredNode(_RadixNode):
+    __slots__ = ("score", "best")
+
+    def __init__(self, label, is_word=False, children=None, count=0):
+        super().__init__(label, is_word, children, count)
+        self.score = None
+        # Highest score in this subtree, or None if there are no words in it
+        self.best = None
+
+    def __deepcopy__(self, memo):
+        new = super().__deepcopy__(memo)
+        new.score = self.score
+        new.best = self.best
+        return new
+
+    def update_best(self):
+        best = self.score if self.is_word else None
+        if self.children:
+            for child in self.children.values():
+                if child.best is not None and (best is None or child.best > best):
+                    best = child.best
+        self.best = best
+
+
+class ScoredTrie(RadixTrie):
+    """A RadixTrie in which each word carries a numeric score
+
+    Use "ScoredTrie.add(word, score)" to insert or re-score a word,
+    and "ScoredTrie.top_k(prefix, k)" to retrieve the k highest
+    scoring words starting with prefix, as (word, score) pairs.
+
+    Each node keeps the best score found below it, so top_k
+    visits the trie best-first, and only descends into
+    the branches that can still contain one of the results.
+    """
+
+    node_cls = _ScoredNode
+
+    def add(self, key, score=1):
+        with self.lock:
+            super().add(key)
+            path = self._path(self.pattern + key)
+            path[-1].score = score
+            for node in reversed(path):
+                node.update_best()
+
+    def discard(self, key):
+        with self.lock:
+            super().discard(key)
+            for node in reversed(self._path(key)):
+                node.update_best()
+
+    def _path(self, key):
+        """List of the nodes from the root down to where key ends or diverges"""
+        node = self.root
+        path = [node]
+        index = 0
+        while index < len(key) and node.children:
+            node = node.children.get(key[index])
+            if node is None or not key.startswith(node.label, index):
+                break
+            path.append(node)
+            index += len(node.label)
+        return path
+
+    def _merge_single_child(self, node):
+        if not node.children or len(node.children) != 1:
+            return
+        (child,) = node.children.values()
+        super()._merge_single_child(node)
+        node.score = child.score
+        node.best = child.best
+
+    def update(self, seq):
+        """Adds words from a mapping of words to scores, or words with a score of 1"""
+        with self.lock:
+            if isinstance(seq, Mapping):
+                for item, score in seq.items():
+                    self.add(item, score)
+                return
+            for item in seq:
+                self.add(item)
+
+    def get_score(self, key, default=None):
+        if key not in self:
+            return default
+        position = self._find(key)
+        return position[0].score
+
+    def top_k(self, prefix="", k=10):
+        """Retrieves the k highest scoring words starting with prefix as (word, score) pairs
+
+        Results come in descending score order, with ties in lexicographic order.
+        """
+        state = self._start(self.pattern + prefix)
+        if state is None or k <= 0 or state[1].best is None:
+            return []
+        text, node = state
+        # A node is pushed with the best score below it, and its own word
+        # with its score: words pop out before any node which can't beat them.
+        heap = [(-node.best, text, 1, node)]
+        results = []
+        while heap and len(results) < k:
+            score, text, is_node, node = heappop(heap)
+            if not is_node:
+                results.append((text, -score))
+                continue
+            if node.is_word:
+                heappush(heap, (-node.score, text, 0, node))
+            for child in node.children.values() if node.children else ():
+                if child.best is not None:
+                    heappush(heap, (-child.best, text + child.label, 1, child))
+        return results
+
+    def copy(self):
+        return type(self)({word: self.get_score(word) for word in self})
+
+    def __repr__(self):
+        return f"ScoredTrie {('prefixed with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
+
+
+def _suffix_array(text):
+    """Positions of all suffixes of text, in sorted order, by prefix doubling"""
+    size = len(text)
+    if not size:
+        return []
+    rank = [ord(char) for char in text]
+    positions = list(range(size))
+    step = 1
+    while True:
+        # Sort by the ranks of the first "step" characters of each suffix
+        # and of the following "step" characters, packed in a single integer
+        base = max(max(rank), size) + 2
+        following = rank[step:] + [-1] * min(step, size)
+        keys = [first * base + second + 1 for first, second in zip(rank, following)]
+        positions.sort(key=keys.__getitem__)
+        current = 0
+        previous = keys[positions[0]]
+        for i in positions:
+            key = keys[i]
+            if key != previous:
+                current += 1
+                previous = key
+            rank[i] = current
+        if current == size - 1:
+            return positions
+        step *= 2
+
+
+def _suffix_range(text, suffixes, pattern):
+    """The (start, stop) range of the positions in suffixes where text starts with pattern"""
+    size = len(pattern)
+
+    def key(i):
+        return text[i : i + size]
+
+    start = bisect_left(suffixes, pattern, key=key)
+    return start, bisect_right(suffixes, pattern, lo=start, key=key)
+
+
+class _SuffixIndex:
+    """The data shared by a SuffixArrayTrie and its views
+
+    All words are kept concatenated in a single string, separated by _WORD_END,
+    along with a suffix array over it: the words containing a pattern
+    are the ones where the suffixes starting with the pattern are.
+    The arrays are rebuilt on the first search after words are added.
+    """
+
+    def __init__(self):
+        self.words = []  # word ids to words, None for discarded words
+        self.ids = {}
+        self.text = ""
+        self.suffixes = array("I")
+        self.starts = array("I")
+        self.dirty = False
+
+    def add(self, word):
+        if word in self.ids:
+            return
+        self.ids[word] = len(self.words)
+        self.words.append(word)
+        self.dirty = True
+
+    def discard(self, word):
+        self.words[self.ids.pop(word)] = None
+
+    def copy(self):
+        new = _SuffixIndex()
+        new.words = self.words[:]
+        new.ids = self.ids.copy()
+        # The text is immutable, and arrays are replaced, never changed, on rebuilds
+        new.text, new.suffixes, new.starts = self.text, self.suffixes, self.starts
+        new.dirty = self.dirty
+        return new
+
+    def _build(self):
+        self.words = list(self.ids)
+        self.ids = {word: i for i, word in enumerate(self.words)}
+        starts = array("I")
+        position = 0
+        for word in self.words:
+            starts.append(position)
+            position += len(word) + 1
+        self.starts = starts
+        self.text = _WORD_END.join(self.words) + _WORD_END
+        self.suffixes = array("I", _suffix_array(self.text))
+        self.dirty = False
+
+    def search(self, pattern):
+        """Yields the ids of the words containing pattern, possibly repeated"""
+        if self.dirty:
+            self._build()
+        if not pattern:
+            yield from (i for i, word in enumerate(self.words) if word is not None)
+            return
+        start, stop = _suffix_range(self.text, self.suffixes, pattern)
+        for index in range(start, stop):
+            word_id = bisect_right(self.starts, self.suffixes[index]) - 1
+            if self.words[word_id] is not None:
+                yield word_id
+
+
+class SuffixArrayTrie(MutableSet):
+    """A pattern-based string container with a Set interface, backed by a suffix array
+
+    Offers the same interface as PatternCharTrie: "SuffixArrayTrie[pattern].contents"
+    is the set of all strings containing pattern, and SuffixArrayTrie[pattern]
+    is another instance **sharing** the same underlying data.
+
+    Instead of storing every rotation of every word, all words are kept
+    in a single string, indexed by a suffix array: memory is a few bytes
+    per character, making it usable for long strings. The index
+    is rebuilt on the first search after new words are added, so
+    it is better suited for data loaded once and queried many times.
+    """
+
+    def __init__(self, initial=None, *, root=None, pattern=""):
+        self.data = root if root is not None else _SuffixIndex()
+        self.pattern = pattern
+        self.lock = RLock()
+        if initial:
+            self.update(initial)
+
+    def _clone(self):
+        new = self.__class__.__new__(self.__class__)
+        new.data = self.data
+        new.lock = self.lock
+        new.pattern = self.pattern
+        return new
+
+    def __getitem__(self, key):
+        sub_instance = self._clone()
+        sub_instance.pattern = self.pattern + key
+        return sub_instance
+
+    @property
+    def contents(self):
+        return set(self)
+
+    def add(self, key):
+        if _ENTRY_END in key or _WORD_END in key:
+            raise ValueError("Invalid character in key")
+        if self.pattern:
+            raise ValueError(
+                "SuffixArrayTrie cannot add new final values having a selected pattern"
+            )
+        with self.lock:
+            self.data.add(key)
+
+    def discard(self, key):
+        if key not in self:
+            raise KeyError(f"No item corresponding to {key}")
+        with self.lock:
+            self.data.discard(key)
+
+    def update(self, seq):
+        with self.lock:
+            for item in seq:
+                self.add(item)
+
+    def vacuum(self):
+        """Rebuilds the index right away, leaving out the space used by discarded words"""
+        with self.lock:
+            self.data._build()
+
+    def save(self, path):
+        """Writes the words in this trie to a binary file, to be opened with MappedTrie"""
+        from .frozen_trie import _write_pattern_file
+
+        with self.lock:
+            _write_pattern_file(path, list(self))
+
+    def copy(self):
+        cls = type(self)
+        return cls(self.contents)
+
+    def __copy__(self):
+        return type(self)(pattern=self.pattern, root=self.data.copy())
+
+    def __contains__(self, key):
+        return key in self.data.ids and self.pattern in key
+
+    def __iter__(self):
+        if not self.pattern:
+            yield from list(self.data.ids)
+            return
+        with self.lock:
+            ids = set(self.data.search(self.pattern))
+        words = self.data.words
+        yield from (words[word_id] for word_id in sorted(ids))
+
+    def __len__(self):
+        if not self.pattern:
+            return len(self.data.ids)
+        with self.lock:
+            return len(set(self.data.search(self.pattern)))
+
+    def __repr__(self):
+        return f"SuffixArrayTrie {('patterned with ' + repr(self.pattern)) if self.pattern else ''} with {len(self)} elements."
+
+
 PrefixTrie = PrefixCharTrie
 Trie = PatternCharTrie
 
-__all__ = ["PrefixCharTrie", "Trie", "NormalizedTrie"]
+__all__ = [
+    "PrefixCharTrie",
+    "Trie",
+    "NormalizedTrie",
+    "RadixTrie",
+    "ScoredTrie",
+    "SuffixArrayTrie",
+]
@@ -0,0 +1,284 @@
+"""Perform some naive timing experiments
+on extradict.TreeDict operations, comparing it with
+simpler alternatives for keeping sorted data:
+a plain dict sorted on demand, and parallel lists maintained with bisect.
+
+Run as `python treedict.py [size]`
+"""
+
+import pickle
+import random
+import sys
+import threading
+import tracemalloc
+from bisect import bisect_left, insort
+
+from extradict import TreeDict, ConcurrentTreeDict, NumericTreeDict
+from extradict.binary_tree_dict import PlainNode
+
+from time import perf_counter
+from timeit import timeit
+
+
+class SortedOnDemandDict(dict):
+    """A plain dict, calling sorted() whenever ordered access is needed"""
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [
+                super(SortedOnDemandDict, self).__getitem__(k)
+                for k in sorted(self)
+                if key.start <= k < key.stop
+            ]
+        return super().__getitem__(key)
+
+    def get_closest_keys(self, key):
+        keys = sorted(self)
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return key, key
+        return (
+            keys[index - 1] if index > 0 else None,
+            keys[index] if index < len(keys) else None,
+        )
+
+
+class BisectList:
+    """Parallel sorted lists of keys and values, maintained with bisect"""
+
+    def __init__(self):
+        self.keys = []
+        self.values = []
+
+    def __setitem__(self, key, value):
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            self.values[index] = value
+            return
+        self.keys.insert(index, key)
+        self.values.insert(index, value)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.values[
+                bisect_left(self.keys, key.start) : bisect_left(self.keys, key.stop)
+            ]
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.values[index]
+        raise KeyError(key)
+
+    def __delitem__(self, key):
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            raise KeyError(key)
+        del self.keys[index]
+        del self.values[index]
+
+    def get_closest_keys(self, key):
+        keys = self.keys
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return key, key
+        return (
+            keys[index - 1] if index > 0 else None,
+            keys[index] if index < len(keys) else None,
+        )
+
+
+class PlainNodeTreeDict(TreeDict):
+    node_cls = PlainNode
+
+
+CONTAINERS = {
+    "TreeDict (AVLNode)": TreeDict,
+    "TreeDict with PlainNode": PlainNodeTreeDict,
+    "NumericTreeDict": NumericTreeDict,
+    "dict + sorted()": SortedOnDemandDict,
+    "bisect list": BisectList,
+}
+
+
+def insertion_orders(size):
+    keys = list(range(size))
+    shuffled = keys[:]
+    random.shuffle(shuffled)
+    zig_zag = [key for i in range(size // 2) for key in (i, size - 1 - i)]
+    return {"random": shuffled, "sorted": keys, "zig-zag": zig_zag}
+
+
+def _time(func, *args):
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def _measure(cls, keys, lookups, slices):
+    """Times the common operations on a cls container filled with keys, in that order"""
+    size = len(keys)
+    widths = (10, size // 100, size // 10)
+    probes = [random.randrange(size) for _ in range(lookups)]
+    closest_probes = [random.randrange(size) + 0.5 for _ in range(lookups)]
+
+    def insert():
+        for key in keys:
+            container[key] = key
+
+    def lookup():
+        for key in probes:
+            container[key]
+
+    def slice_(width):
+        for _ in range(slices):
+            start = random.randrange(size - width)
+            container[start : start + width]
+
+    def closest():
+        for key in closest_probes:
+            container.get_closest_keys(key)
+
+    def delete():
+        for key in keys[::2]:
+            del container[key]
+
+    container = cls()
+    results = [f"insert: {_time(insert):.04f}s"]
+    # Tracing slows down node allocations: memory is measured in a second build
+    tracemalloc.start()
+    traced = cls()
+    for key in keys:
+        traced[key] = key
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+    results.append(f"lookups: {_time(lookup):.04f}s")
+    for width in widths:
+        results.append(f"{slices} slices of {width}: {_time(slice_, width):.04f}s")
+    results.append(f"closest keys: {_time(closest):.04f}s")
+    results.append(f"delete half: {_time(delete):.04f}s")
+    results.append(f"memory: {memory / size:.1f} bytes per key")
+    return results
+
+
+def compare_containers(size=20000, lookups=5000, slices=200):
+    """Times each container in CONTAINERS for the most common operations"""
+    # Unbalanced trees degenerate into linked lists on ordered inserts:
+    # recursing down them has to stay within the recursion limit
+    degenerate_size = min(size, sys.getrecursionlimit() // 2)
+    for order_name, keys in insertion_orders(size).items():
+        print(f"{size} keys inserted in {order_name} order:")
+        for name, cls in CONTAINERS.items():
+            if cls is PlainNodeTreeDict and order_name != "random":
+                small_keys = insertion_orders(degenerate_size)[order_name]
+                results = _measure(
+                    cls,
+                    small_keys,
+                    lookups * degenerate_size // size,
+                    slices * degenerate_size // size,
+                )
+                name += f" ({degenerate_size} keys - degenerate tree)"
+            else:
+                results = _measure(cls, keys, lookups, slices)
+            print(f"    {name}:\n        " + "\n        ".join(results))
+
+
+def batched_lookups(size=100000, probes=10000, number=5):
+    tree = TreeDict()
+    for key in random.sample(range(size * 2), size):
+        tree[key] = key
+    keys = [random.randrange(size * 2) for _ in range(probes)]
+    variants = [
+        ("loop of tree.get(k)", "[tree.get(k) for k in keys]"),
+        ("tree.get_many(keys)", "tree.get_many(keys)"),
+        (
+            "tree.get_many(keys, input_order=False)",
+            "tree.get_many(keys, input_order=False)",
+        ),
+    ]
+    print(f"Looking up {probes} keys in a {size} keys TreeDict:")
+    for name, statement in variants:
+        time = timeit(statement, number=number, globals={"tree": tree, "keys": keys})
+        print(f"    {name} {number} times: {time:.04f}s")
+
+
+def reload(size=100000, number=3):
+    items = [(key, str(key)) for key in range(size)]
+    tree = TreeDict.from_sorted(items)
+    data = pickle.dumps(tree)
+    variants = [
+        ("inserting pairs one by one", "TreeDict(*items)"),
+        ("TreeDict.from_sorted(items)", "TreeDict.from_sorted(items)"),
+        ("pickle.dumps(tree)", "pickle.dumps(tree)"),
+        ("pickle.loads(data)", "pickle.loads(data)"),
+    ]
+    print(f"Building a {size} keys TreeDict:")
+    for name, statement in variants:
+        time = timeit(
+            statement,
+            number=number,
+            globals={
+                "TreeDict": TreeDict,
+                "pickle": pickle,
+                "items": items,
+                "tree": tree,
+                "data": data,
+            },
+        )
+        print(f"    {name} {number} times: {time:.04f}s")
+
+
+def threaded_throughput(size=10000, readers=4, writers=1, operations=20000):
+    """Compares ConcurrentTreeDict with a TreeDict guarded by a single mutex"""
+
+    class LockedTreeDict(TreeDict):
+        lock = threading.Lock()
+
+        def __getitem__(self, key):
+            with self.lock:
+                return super().__getitem__(key)
+
+        def __setitem__(self, key, value):
+            with self.lock:
+                super().__setitem__(key, value)
+
+    def reader(tree):
+        for _ in range(operations):
+            start = random.randrange(size)
+            tree[start : start + 10]
+
+    def writer(tree):
+        for _ in range(operations):
+            key = random.randrange(size)
+            tree[key] = key
+
+    print(
+        f"{readers} reader threads slicing and {writers} writer threads inserting, "
+        f"{operations} operations each:"
+    )
+    for cls in (LockedTreeDict, ConcurrentTreeDict):
+        tree = cls.from_sorted((key, key) for key in range(size))
+        threads = [
+            threading.Thread(target=reader, args=(tree,)) for _ in range(readers)
+        ]
+        threads += [
+            threading.Thread(target=writer, args=(tree,)) for _ in range(writers)
+        ]
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time = perf_counter() - start
+        total = operations * (readers + writers)
+        print(f"    {cls.__name__}: {time:.04f}s, {total / time:.0f} operations/s")
+
+
+def main(size=20000):
+    compare_containers(size)
+    batched_lookups(size)
+    reload(size)
+    threaded_throughput(size)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
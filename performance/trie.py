@@ -0,0 +1,353 @@
+"""Perform some naive timing and memory experiments
+on extradict tries.
+
+Run as `python trie.py [size] [wordlist_file]`:
+if no word list is given, random pronounceable words are generated.
+"""
+
+import fnmatch
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+from extradict.frozen_trie import FrozenTrie, MappedTrie
+from extradict.trie import (
+    PatternCharTrie,
+    PrefixCharTrie,
+    RadixTrie,
+    ScoredTrie,
+    SuffixArrayTrie,
+)
+
+from time import perf_counter
+
+
+def generate_words(size, seed=42):
+    """Random words made of syllables, so that they share prefixes like real words do"""
+    rng = random.Random(seed)
+    syllables = [c + v for c in "bcdfghjklmnprstvz" for v in "aeiou"] + list("aeiou")
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(syllables, k=rng.randint(1, 6))))
+    return list(words)
+
+
+def load_words(size, path=None):
+    if path is None:
+        return generate_words(size)
+    with open(path, encoding="utf-8") as file:
+        return [line.strip() for line, _ in zip(file, range(size)) if line.strip()]
+
+
+def measure_build(build):
+    """Times build() and measures the memory it takes in a second, traced, run"""
+    start = perf_counter()
+    build()
+    elapsed = perf_counter() - start
+    tracemalloc.start()
+    trie = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return trie, elapsed, memory
+
+
+def compare_backends(size=100000, path=None, lookups=100000):
+    words = load_words(size, path)
+    chars = sum(len(word) for word in words)
+    probes = [random.choice(words) for _ in range(lookups // 2)]
+    probes += [word + "x" for word in probes]
+    prefixes = [word[: max(1, len(word) // 2)] for word in probes[: lookups // 10]]
+    print(f"{len(words)} words, {chars} characters:")
+    for cls in (set, PrefixCharTrie, RadixTrie, FrozenTrie):
+        trie, elapsed, memory = measure_build(lambda: cls(words))
+        start = perf_counter()
+        for word in probes:
+            word in trie
+        lookup_time = perf_counter() - start
+        results = [
+            f"build: {elapsed:.03f}s",
+            f"memory: {memory / 2 ** 20:.1f}MB ({memory / chars:.1f} bytes per character)",
+            f"{len(probes)} lookups: {lookup_time:.04f}s",
+        ]
+        if cls is not set:
+            start = perf_counter()
+            for prefix in prefixes:
+                trie[prefix].contents
+            results.append(
+                f"{len(prefixes)} prefix searches: {perf_counter() - start:.04f}s"
+            )
+        print(f"    {cls.__name__}:\n        " + "\n        ".join(results))
+        del trie
+
+
+def autocomplete(size=100000, path=None, k=10, queries=2000):
+    """Compares ScoredTrie.top_k with sorting all the completions by score"""
+    words = load_words(size, path)
+    queries = min(queries, len(words))
+    scores = {word: random.randint(1, 1000) for word in words}
+    prefixes = [word[:2] for word in random.sample(words, queries)]
+    trie = ScoredTrie(scores)
+    plain = PrefixCharTrie(words)
+
+    def sort_all():
+        for prefix in prefixes:
+            sorted(plain[prefix].contents, key=scores.__getitem__, reverse=True)[:k]
+
+    def top_k():
+        for prefix in prefixes:
+            trie.top_k(prefix, k)
+
+    print(f"Top {k} completions for {queries} two letter prefixes:")
+    for name, func in (("sorting contents", sort_all), ("ScoredTrie.top_k", top_k)):
+        start = perf_counter()
+        func()
+        print(f"    {name}: {perf_counter() - start:.04f}s")
+
+
+def substring_search(size=10000, path=None, queries=1000):
+    """Compares build time and memory of the substring search tries"""
+    words = load_words(size, path)
+    queries = min(queries, len(words))
+    chars = sum(len(word) for word in words)
+    patterns = [
+        word[len(word) // 3 : len(word) // 3 + 3] or word
+        for word in random.sample(words, queries)
+    ]
+    print(f"Substring search on {len(words)} words, {chars} characters:")
+
+    def build(cls):
+        trie = cls(words)
+        # SuffixArrayTrie builds its index on the first search
+        trie["a"].contents
+        return trie
+
+    for cls in (PatternCharTrie, SuffixArrayTrie):
+        trie, elapsed, memory = measure_build(lambda: build(cls))
+        start = perf_counter()
+        for pattern in patterns:
+            trie[pattern].contents
+        print(
+            f"    {cls.__name__}:\n        build: {elapsed:.03f}s\n"
+            f"        memory: {memory / 2 ** 20:.1f}MB ({memory / chars:.1f} bytes per character)\n"
+            f"        {queries} searches: {perf_counter() - start:.04f}s"
+        )
+        del trie
+
+
+def startup(size=100000, path=None):
+    """Compares loading words into a trie with opening a saved one"""
+    words = load_words(size, path)
+    with tempfile.TemporaryDirectory() as directory:
+        prefix_file = os.path.join(directory, "prefix.trie")
+        pattern_file = os.path.join(directory, "pattern.trie")
+        FrozenTrie(words).save(prefix_file)
+        SuffixArrayTrie(words).save(pattern_file)
+        print(f"Getting a trie with {len(words)} words ready for queries:")
+        variants = [
+            ("PrefixCharTrie(words)", lambda: PrefixCharTrie(words)),
+            ("RadixTrie(words)", lambda: RadixTrie(words)),
+            ("MappedTrie(prefix_file)", lambda: MappedTrie(prefix_file)),
+            ("MappedTrie(pattern_file)", lambda: MappedTrie(pattern_file)),
+        ]
+        for name, load in variants:
+            start = perf_counter()
+            trie = load()
+            "a" in trie
+            print(f"    {name}: {perf_counter() - start:.04f}s")
+            if isinstance(trie, MappedTrie):
+                trie.close()
+            # Don't time the release of the previous trie in the next load
+            del trie
+
+
+def fuzzy_search(size=100000, path=None, queries=5, max_distance=2):
+    """Compares Trie.fuzzy with computing the edit distance to every word"""
+    words = load_words(size, path)
+    queries = min(queries, len(words))
+    trie = RadixTrie(words)
+    typos = []
+    for word in random.sample(words, queries):
+        position = random.randrange(len(word))
+        typos.append(word[:position] + "x" + word[position + 1 :])
+
+    def brute_force():
+        # The same Levenshtein rows the trie carries, but computed for every word
+        for typo in typos:
+            first_row = list(range(len(typo) + 1))
+            [
+                word
+                for word in words
+                if trie._distance_row(first_row, typo, word)[-1] <= max_distance
+            ]
+
+    def fuzzy():
+        for typo in typos:
+            trie.fuzzy(typo, max_distance)
+
+    print(f"{queries} searches within {max_distance} edits in {len(words)} words:")
+    for name, func in (("edit distance to every word", brute_force), ("fuzzy", fuzzy)):
+        start = perf_counter()
+        func()
+        print(f"    {name}: {perf_counter() - start:.04f}s")
+
+
+def keyword_tagging(size=100000, path=None, keywords=2000, text_size=200000):
+    """Compares an AhoCorasick scan with checking every substring of a text in a trie"""
+    words = load_words(size, path)
+    keywords = min(keywords, len(words))
+    trie = PrefixCharTrie(random.sample(words, keywords))
+    longest = max(len(word) for word in trie)
+    text = " ".join(random.choices(words, k=text_size // 8))
+    scanner = trie.scanner()
+
+    def substrings():
+        return [
+            (i, text[i:j])
+            for i in range(len(text))
+            for j in range(i + 1, min(i + longest, len(text)) + 1)
+            if text[i:j] in trie
+        ]
+
+    def scan():
+        return list(scanner.scan(text))
+
+    print(f"Finding {keywords} keywords in a {len(text)} characters text:")
+    for name, func in (("substrings in trie", substrings), ("AhoCorasick.scan", scan)):
+        start = perf_counter()
+        func()
+        print(f"    {name}: {perf_counter() - start:.04f}s")
+
+
+def tokenize(size=100000, path=None, text_size=100000):
+    """Compares prefixes_of with looking up every slice of a text, to find all the words at each position"""
+    words = load_words(size, path)
+    longest = max(len(word) for word in words)
+    text = "".join(random.choices(words, k=text_size // 8))
+    print(f"Words starting at each position of a {len(text)} characters text:")
+    for cls in (PrefixCharTrie, RadixTrie, FrozenTrie):
+        trie = cls(words)
+
+        def slices():
+            return [
+                [
+                    text[i:j]
+                    for j in range(i + 1, min(i + longest, len(text)) + 1)
+                    if text[i:j] in trie
+                ]
+                for i in range(len(text))
+            ]
+
+        def prefixes_of():
+            return [
+                list(trie.prefixes_of(text[i : i + longest])) for i in range(len(text))
+            ]
+
+        results = []
+        for name, func in (("slices in trie", slices), ("prefixes_of", prefixes_of)):
+            start = perf_counter()
+            func()
+            results.append(f"{name}: {perf_counter() - start:.04f}s")
+        print(f"    {cls.__name__}:\n        " + "\n        ".join(results))
+        del trie
+
+
+def wildcard_search(size=100000, path=None, queries=200):
+    """Compares Trie.match with filtering all the words with fnmatch"""
+    words = load_words(size, path)
+    queries = min(queries, len(words))
+    samples = random.sample(words, queries)
+    anchored = [word[:2] + "?" + word[3:4] + "*" for word in samples]
+    floating = ["*" + word[1:3] + "?" + word[4:5] + "*" for word in samples]
+    print(f"{queries} wildcard searches in {len(words)} words:")
+    for cls, globs in (
+        (PrefixCharTrie, anchored),
+        (RadixTrie, anchored),
+        (PatternCharTrie, floating),
+    ):
+        trie = cls(words if cls is not PatternCharTrie else words[: size // 10])
+        contents = list(trie)
+
+        def filter_contents():
+            for glob in globs:
+                fnmatch.filter(contents, glob)
+
+        def match():
+            for glob in globs:
+                trie.match(glob)
+
+        results = []
+        for name, func in (("fnmatch.filter", filter_contents), ("match", match)):
+            start = perf_counter()
+            func()
+            results.append(f"{name}: {perf_counter() - start:.04f}s")
+        print(
+            f"    {cls.__name__} ({len(contents)} words, {globs[0]!r}):\n        "
+            + "\n        ".join(results)
+        )
+        del trie
+
+
+def bulk_load(size=100000, path=None):
+    """Compares adding words one by one with the from_iterable bulk loader"""
+    words = load_words(size, path)
+    sorted_words = sorted(words)
+    print(f"Loading {len(words)} words:")
+    for cls, count in ((PrefixCharTrie, size), (PatternCharTrie, size // 10)):
+        variants = [
+            (f"{cls.__name__}(words)", lambda: cls(words[:count])),
+            (
+                f"{cls.__name__}.from_iterable(words)",
+                lambda: cls.from_iterable(words[:count]),
+            ),
+            (
+                f"{cls.__name__}.from_iterable(sorted, presorted=True)",
+                lambda: cls.from_iterable(sorted_words[:count], presorted=True),
+            ),
+            (
+                f"{cls.__name__}.from_iterable(sorted, presorted=True, pause_gc=True)",
+                lambda: cls.from_iterable(
+                    sorted_words[:count], presorted=True, pause_gc=True
+                ),
+            ),
+        ]
+        for name, build in variants:
+            start = perf_counter()
+            trie = build()
+            print(f"    {name} ({count} words): {perf_counter() - start:.04f}s")
+            del trie
+
+
+def parallel_freeze(size=1000000, path=None, processes=None):
+    """Compares compiling a FrozenTrie in this process with building its parts in a process pool"""
+    words = load_words(size, path)
+    print(
+        f"Compiling {len(words)} words into a FrozenTrie, "
+        f"{processes or os.cpu_count()} processes:"
+    )
+    for name, kwargs in (
+        ("one process", {}),
+        ("process pool", {"processes": processes}),
+    ):
+        start = perf_counter()
+        trie = FrozenTrie.from_iterable(words, **kwargs)
+        print(f"    {name}: {perf_counter() - start:.04f}s ({len(trie.finals)} states)")
+        del trie
+
+
+def main(size=100000, path=None):
+    compare_backends(int(size), path)
+    autocomplete(int(size), path)
+    substring_search(int(size) // 10, path)
+    startup(int(size), path)
+    fuzzy_search(int(size), path)
+    keyword_tagging(int(size), path)
+    tokenize(int(size), path)
+    wildcard_search(int(size), path)
+    bulk_load(int(size), path)
+    parallel_freeze(int(size) * 10, path)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
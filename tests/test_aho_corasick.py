@@ -0,0 +1,59 @@
+import pytest
+
+from extradict.aho_corasick import AhoCorasick
+from extradict.trie import PrefixCharTrie, RadixTrie
+from extradict.frozen_trie import FrozenTrie
+
+
+def _naive_scan(words, text):
+    return sorted(
+        (i, word)
+        for word in set(words)
+        if word
+        for i in range(len(text))
+        if text.startswith(word, i)
+    )
+
+
+def test_scan_finds_overlapping_words():
+    a = AhoCorasick(["he", "she", "his", "hers"])
+    assert list(a.scan("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+    assert list(a.scan("")) == []
+    assert list(a.scan("xyz")) == []
+
+
+def test_scan_reports_longest_first_at_the_same_end():
+    a = AhoCorasick(["a", "aa", "aaa"])
+    assert list(a.scan("aaa")) == [
+        (0, "a"),
+        (0, "aa"),
+        (1, "a"),
+        (0, "aaa"),
+        (1, "aa"),
+        (2, "a"),
+    ]
+
+
+def test_scan_streaming_chunks():
+    a = AhoCorasick(["keyword", "word", "or"])
+    chunks = ["some key", "wo", "rd and a w", "ord"]
+    assert list(a.scan(chunks)) == list(a.scan("".join(chunks)))
+    assert (5, "keyword") in list(a.scan(iter(chunks)))
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, RadixTrie, FrozenTrie))
+def test_scanner_from_tries(cls):
+    a = cls(["car", "carpet", "pet", ""]).scanner()
+    assert isinstance(a, AhoCorasick)
+    assert len(a) == 3
+    assert list(a.scan("my carpet")) == [(3, "car"), (3, "carpet"), (6, "pet")]
+
+
+def test_scan_agrees_with_naive_search():
+    import random
+
+    rng = random.Random(23)
+    words = ["".join(rng.choices("ab", k=rng.randint(1, 5))) for _ in range(30)]
+    text = "".join(rng.choices("abc", k=500))
+    a = AhoCorasick(words)
+    assert sorted(a.scan(text)) == _naive_scan(words, text)
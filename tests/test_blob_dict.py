@@ -106,3 +106,13 @@ def test_blob_text_dict_wont_crash_on_second_realloc():
     aa["c"] = ["ghi"]
     aa["b"].add("b" * 1500)
     aa["a"].add("jkl")
+
+
+def test_blob_text_dict_clear_releases_blob():
+    aa = BlobTextDict()
+    aa["a"] = ["a" * 10000]
+    aa.clear()
+    assert len(aa) == 0
+    assert len(aa.blob.data) < 16384
+    aa["b"] = ["def"]
+    assert set(aa["b"]) == {"def"}
@@ -0,0 +1,292 @@
+import pickle
+
+import pytest
+
+from extradict.frozen_trie import (
+    FrozenTrie,
+    MappedTrie,
+    MappedPrefixTrie,
+    MappedPatternTrie,
+)
+from extradict.trie import (
+    PrefixCharTrie,
+    PatternCharTrie,
+    NormalizedTrie,
+    RadixTrie,
+    ScoredTrie,
+    SuffixArrayTrie,
+)
+
+WORDS = ["", "car", "cart", "carpet", "cat", "talk", "talking", "walk", "walking"]
+
+
+def test_frozen_trie_membership_and_iteration():
+    a = FrozenTrie(reversed(WORDS))
+    assert list(a) == sorted(WORDS)
+    assert len(a) == len(WORDS)
+    for word in WORDS:
+        assert word in a
+    assert "ca" not in a
+    assert "walkings" not in a
+    assert "x" not in a
+
+
+def test_frozen_trie_prefix_views():
+    a = FrozenTrie(WORDS)
+    assert a["car"].contents == {"car", "cart", "carpet"}
+    assert len(a["car"]) == 3
+    assert len(a["ca"]["r"]) == 3
+    assert "cart" in a["car"] and "cat" not in a["car"]
+    assert len(a["dog"]) == 0
+    assert list(a["dog"]) == []
+    assert list(a.iter_prefix("ca", limit=2)) == ["car", "carpet"]
+    assert list(a.iter_prefix("ca", order="shortest")) == [
+        "car",
+        "cat",
+        "cart",
+        "carpet",
+    ]
+
+
+def test_frozen_trie_shares_suffixes():
+    a = FrozenTrie(["talking", "walking"])
+    # Both 't' and 'w' lead to the same "alking" chain: 8 states instead of 15
+    assert len(a.finals) == 8
+    assert len(a.labels) == 8
+
+
+def test_frozen_trie_is_immutable_and_hashable():
+    a = FrozenTrie(WORDS)
+    assert not hasattr(a, "add")
+    assert not hasattr(a, "discard")
+    assert hash(a) == hash(FrozenTrie(WORDS))
+    assert a == set(WORDS)
+    assert a.copy() is a
+
+
+def test_frozen_trie_pickles():
+    a = FrozenTrie(WORDS)
+    b = pickle.loads(pickle.dumps(a))
+    assert list(b) == list(a)
+    assert len(b["walk"]) == 2
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, RadixTrie, ScoredTrie))
+def test_freeze_mutable_tries(cls):
+    a = cls(WORDS)
+    frozen = a.freeze()
+    assert isinstance(frozen, FrozenTrie)
+    assert frozen == set(WORDS)
+    assert a["car"].freeze() == {"car", "cart", "carpet"}
+    a.add("dog")
+    assert "dog" not in frozen
+
+
+def test_pattern_trie_cant_be_frozen():
+    with pytest.raises(TypeError):
+        PatternCharTrie(WORDS).freeze()
+
+
+def test_frozen_trie_agrees_with_mutable_trie():
+    import random
+
+    rng = random.Random(13)
+    words = ["".join(rng.choices("abcd", k=rng.randint(0, 7))) for _ in range(500)]
+    a = PrefixCharTrie(words)
+    frozen = a.freeze()
+    assert list(frozen) == list(a)
+    for prefix in ("", "a", "ab", "dca", "bbb"):
+        assert frozen[prefix].contents == a[prefix].contents
+        assert len(frozen[prefix]) == len(a[prefix])
+
+
+@pytest.mark.parametrize("cls", (FrozenTrie, PrefixCharTrie, RadixTrie))
+def test_mapped_trie_from_prefix_tries(cls, tmp_path):
+    path = tmp_path / "words.trie"
+    cls(WORDS).save(path)
+    with MappedTrie(path) as a:
+        assert isinstance(a, MappedPrefixTrie)
+        assert list(a) == sorted(WORDS)
+        assert "carpet" in a and "carp" not in a
+        assert a["car"].contents == {"car", "cart", "carpet"}
+        assert len(a["walk"]) == 2
+        assert list(a.iter_prefix("ta", order="shortest")) == ["talk", "talking"]
+        assert a == FrozenTrie(WORDS)
+
+
+@pytest.mark.parametrize("cls", (PatternCharTrie, SuffixArrayTrie))
+def test_mapped_trie_from_pattern_tries(cls, tmp_path):
+    path = tmp_path / "words.trie"
+    words = [word for word in WORDS if word] + ["oscar", "çà"]
+    cls(words).save(path)
+    with MappedTrie(path) as a:
+        assert isinstance(a, MappedPatternTrie)
+        assert len(a) == len(words)
+        assert sorted(a) == sorted(words)
+        assert a["car"].contents == {"car", "cart", "carpet", "oscar"}
+        assert a["al"]["k"].contents == {"talk", "talking", "walk", "walking"}
+        assert len(a["alking"]) == 2
+        assert "çà" in a and "talk" in a
+        assert "alk" not in a and "talkin" not in a
+        assert "talk" not in a["car"]
+
+
+def test_mapped_prefix_trie_searches_the_labels_in_place(tmp_path):
+    words = ["ação", "ațâ", "cão", "z€z", "😀ok", "ok"]
+    FrozenTrie(words).save(tmp_path / "words.trie")
+    with MappedTrie(tmp_path / "words.trie") as a:
+        assert not isinstance(a.labels, str)
+        assert list(a) == sorted(words)
+        assert a["a"].contents == {"ação", "ațâ"}
+        assert "😀ok" in a and "😀o" not in a and "ax" not in a
+        assert a.fuzzy("z€", 1) == [("z€z", 1)]
+        a.save(tmp_path / "again.trie")
+    with MappedTrie(tmp_path / "again.trie") as b:
+        assert list(b) == sorted(words)
+
+
+def test_mapped_pattern_trie_searches_the_text_in_place(tmp_path):
+    path = tmp_path / "words.trie"
+    words = ["ação", "ațâ", "cão", "z€z", "😀ok", "ok"]
+    PatternCharTrie(words).save(path)
+    with MappedTrie(path) as a:
+        assert not isinstance(a.text, str)
+        for word in words:
+            assert word in a
+            for i in range(len(word)):
+                pattern = word[i : i + 2]
+                assert a[pattern].contents == {w for w in words if pattern in w}
+        assert "ação" not in a["ok"]
+
+
+def test_mapped_trie_saves_views(tmp_path):
+    FrozenTrie(WORDS)["car"].save(tmp_path / "prefix.trie")
+    PatternCharTrie(WORDS)["alk"].save(tmp_path / "pattern.trie")
+    with MappedTrie(tmp_path / "prefix.trie") as a:
+        assert set(a) == {"car", "cart", "carpet"}
+    with MappedTrie(tmp_path / "pattern.trie") as a:
+        assert set(a) == {"talk", "talking", "walk", "walking"}
+
+
+def test_mapped_trie_pickles_by_reopening_the_file(tmp_path):
+    path = tmp_path / "words.trie"
+    FrozenTrie(WORDS).save(path)
+    with MappedTrie(path) as a:
+        b = pickle.loads(pickle.dumps(a["ca"]))
+    assert b.contents == {"car", "cart", "carpet", "cat"}
+    b.close()
+
+
+def test_mapped_trie_is_shared_with_forked_processes(tmp_path):
+    import multiprocessing
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("No fork on this platform")
+    path = tmp_path / "words.trie"
+    FrozenTrie(WORDS).save(path)
+    with MappedTrie(path) as a:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(2) as pool:
+            assert pool.map(a.__contains__, ["cat", "dog"]) == [True, False]
+
+
+def test_mapped_trie_rejects_other_files(tmp_path):
+    path = tmp_path / "other.trie"
+    path.write_bytes(b"not a trie" * 10)
+    with pytest.raises(ValueError):
+        MappedTrie(path)
+    FrozenTrie(WORDS).save(path)
+    with pytest.raises(ValueError):
+        MappedPatternTrie(path)
+
+
+def test_normalized_trie_cant_be_saved(tmp_path):
+    with pytest.raises(TypeError):
+        NormalizedTrie(WORDS).save(tmp_path / "words.trie")
+
+
+def test_frozen_and_mapped_tries_fuzzy_search(tmp_path):
+    a = FrozenTrie(WORDS)
+    assert a.fuzzy("wakl", 2) == [("walk", 2)]
+    assert a.fuzzy("cars", 1) == [("car", 1), ("cart", 1)]
+    a.save(tmp_path / "words.trie")
+    with MappedTrie(tmp_path / "words.trie") as b:
+        assert b.fuzzy("talkin", 1) == [("talking", 1)]
+
+
+def test_frozen_and_mapped_tries_prefixes_of_text(tmp_path):
+    a = FrozenTrie(WORDS)
+    assert list(a.prefixes_of("carts")) == ["", "car", "cart"]
+    assert a["cart"].longest_prefix_of("carts") == "cart"
+    a.save(tmp_path / "words.trie")
+    with MappedTrie(tmp_path / "words.trie") as b:
+        assert b.longest_prefix_of("walkers") == "walk"
+
+
+def test_frozen_and_mapped_tries_match_wildcards(tmp_path):
+    a = FrozenTrie(WORDS)
+    assert a.match("*alk*") == ["talk", "talking", "walk", "walking"]
+    assert a["car"].match("*t") == ["carpet", "cart"]
+    a.save(tmp_path / "words.trie")
+    with MappedTrie(tmp_path / "words.trie") as b:
+        assert b.match("c?r*") == ["car", "carpet", "cart"]
+
+
+def test_frozen_trie_from_sorted_stream(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("".join(word + "\n" for word in sorted(WORDS)))
+    with open(path) as file:
+        a = FrozenTrie.from_iterable(
+            (line.rstrip("\n") for line in file), presorted=True
+        )
+    assert list(a) == list(FrozenTrie(WORDS))
+    with pytest.raises(ValueError):
+        FrozenTrie.from_iterable(["walk", "talk"], presorted=True)
+
+
+def test_frozen_trie_pauses_the_gc_only_when_asked():
+    import gc
+
+    seen = []
+
+    def words():
+        for word in ["car", "cart", "cat"]:
+            seen.append(gc.isenabled())
+            yield word
+
+    FrozenTrie(words())
+    FrozenTrie.from_iterable(words())
+    assert seen == [True] * 6
+    FrozenTrie.from_iterable(words(), pause_gc=True)
+    assert seen[6:] == [False] * 3
+    assert gc.isenabled()
+
+
+@pytest.mark.parametrize("processes", (2, 3, 20))
+def test_frozen_trie_built_in_parallel_processes(processes, tmp_path):
+    import random
+
+    rng = random.Random(41)
+    words = {"".join(rng.choices("abcdef", k=rng.randint(0, 6))) for _ in range(300)}
+    a = FrozenTrie(words)
+    b = FrozenTrie.from_iterable(words, processes=processes)
+    assert list(b) == list(a)
+    assert b == a
+    for prefix in ("", "a", "ab", "fed", "x"):
+        assert len(b[prefix]) == len(a[prefix])
+    assert b.fuzzy("abcd", 1) == a.fuzzy("abcd", 1)
+    b.save(tmp_path / "words.trie")
+    with MappedTrie(tmp_path / "words.trie") as c:
+        assert list(c["ab"]) == list(a["ab"])
+
+
+@pytest.mark.parametrize("processes", (1, 2))
+def test_frozen_trie_presorted_order_is_checked_for_any_processes(processes):
+    with pytest.raises(ValueError):
+        FrozenTrie.from_iterable(["walk", "talk"], presorted=True, processes=processes)
+    with pytest.raises(ValueError):
+        FrozenTrie.from_iterable(["ab", "b", "aa"], presorted=True, processes=processes)
+    a = FrozenTrie.from_iterable(
+        ["a", "ab", "ab", "b"], presorted=True, processes=processes
+    )
+    assert list(a) == ["a", "ab", "b"]
@@ -2,7 +2,15 @@ import threading
 from time import sleep
 from unittest.mock import patch
 
-from extradict.binary_tree_dict import PlainNode, AVLNode, TreeDict
+from extradict.binary_tree_dict import (
+    PlainNode,
+    AVLNode,
+    TreeDict,
+    TreeMultiDict,
+    IntervalTreeDict,
+    ConcurrentTreeDict,
+    NumericTreeDict,
+)
 
 import pytest
 
@@ -488,3 +496,554 @@ def test_treedict_clear_and_reinsert():
     assert len(a) == 2
     assert "c" in a
     assert "a" not in a
+
+
+@pytest.mark.parametrize("chunk_size", [2, 3, 1024])
+@pytest.mark.parametrize(
+    ["slice_", "expected"],
+    [
+        [(0, 2, None), (0, 1)],
+        [(0.5, 3.5, None), (1, 2, 3)],
+        [(-2, 2, None), (0, 1)],
+        [(4, 7, None), (4, 5, 6)],
+        [(None, None, None), (0, 1, 2, 3, 4, 5, 6, 7, 8)],
+        [(3, 0, -1), (3, 2, 1)],
+        [(None, None, -1), (8, 7, 6, 5, 4, 3, 2, 1, 0)],
+        [(0, None, 3), (0, 3, 6)],
+        [(None, 1, -2), (8, 6, 4, 2)],
+        [(6.5, None, -2), (6, 4, 2, 0)],
+        [(0, 2, -1), ()],
+        [(2, 0, 1), ()],
+    ],
+)
+def test_numeric_treedict_slice_works(chunk_size, slice_, expected):
+    a = NumericTreeDict(chunk_size=chunk_size)
+    for key in (4, 0, 8, 1, 7, 2, 6, 3, 5):
+        a[key] = key * 10
+    assert a[slice(*slice_)] == [key * 10 for key in expected]
+
+
+def test_numeric_treedict_matches_reference():
+    import random
+
+    keys = random.sample(range(10000), 2000)
+    a = NumericTreeDict(typecode="q", chunk_size=16)
+    reference = {}
+    for key in keys:
+        a[key] = reference[key] = str(key)
+    for key in keys[::3]:
+        del a[key]
+        del reference[key]
+    assert len(a) == len(reference)
+    assert list(a) == sorted(reference)
+    assert (
+        a[100:5000:7]
+        == [reference[k] for k in sorted(reference) if 100 <= k < 5000][::7]
+    )
+    b = TreeDict(reference)
+    for key in (-1, 0, 500, 5000.5, 10001):
+        assert a.get_closest_keys(key) == b.get_closest_keys(key)
+
+
+def test_numeric_treedict_mapping_interface():
+    a = NumericTreeDict({1.5: "a", 0.5: "b"})
+    a[1.5] = "c"
+    assert len(a) == 2
+    assert a[1.5] == "c"
+    assert list(a.items()) == [(0.5, "b"), (1.5, "c")]
+    del a[0.5]
+    assert 0.5 not in a
+    with pytest.raises(KeyError):
+        del a[0.5]
+    assert NumericTreeDict().get_closest_keys(1) == (None, None)
+
+
+def test_numeric_treedict_incompatible_keys_are_missing():
+    a = NumericTreeDict({1: 2})
+    assert "a" not in a
+    assert a.get("a") is None
+    with pytest.raises(KeyError):
+        a["a"]
+    with pytest.raises(KeyError):
+        del a[None]
+
+
+@pytest.mark.parametrize(
+    ["key", "k", "distance", "expected"],
+    [
+        [20, 1, None, [20]],
+        [20, 3, None, [20, 14, 30]],
+        [21, 4, None, [20, 30, 14, 31]],
+        [29, 3, lambda a, b: abs(a - b), [30, 31, 35]],
+        [12, 3, lambda a, b: abs(a - b), [10, 14, 20]],
+        [-5, 3, None, [0, 10, 14]],
+        [50, 3, None, [35, 31, 30]],
+        [14, 100, None, [14, 10, 20, 0, 30, 31, 35]],
+    ],
+)
+def test_treedict_nearest(key, k, distance, expected):
+    a = TreeDict()
+    for i in (30, 10, 0, 35, 20, 14, 31):
+        a[i] = i
+    assert a.nearest(key, k, distance) == expected
+
+
+def test_treedict_nearest_walks_large_tree():
+    a = TreeDict()
+    for i in range(0, 1000, 2):
+        a[i] = i
+    result = a.nearest(501, 10, distance=lambda a, b: abs(a - b))
+    assert sorted(result) == list(range(492, 512, 2))
+    assert TreeDict().nearest(1) == []
+
+
+def test_treedict_floor_and_ceiling_keys():
+    a = TreeDict({10: "a", 20: "b", 30: "c"})
+    assert a.floor_key(20) == a.ceiling_key(20) == 20
+    assert a.floor_key(25) == 20
+    assert a.ceiling_key(25) == 30
+    assert a.floor_key(5) is None
+    assert a.ceiling_key(35) is None
+
+
+def test_treedict_min_max_items():
+    a = TreeDict()
+    with pytest.raises(KeyError):
+        a.min_item()
+    for i in (5, 3, 8, 1):
+        a[i] = str(i)
+    assert a.min_item() == (1, "1")
+    assert a.max_item() == (8, "8")
+    assert len(a) == 4
+
+
+def test_treedict_popmin_popmax():
+    import random
+
+    keys = list(range(200))
+    random.shuffle(keys)
+    a = TreeDict()
+    for key in keys:
+        a[key] = -key
+    assert a.popmin() == (0, 0)
+    assert a.popmax() == (199, -199)
+    assert len(a) == 198
+    assert list(a) == list(range(1, 199))
+    assert a.root.balanced
+    while a:
+        a.popmin()
+    with pytest.raises(KeyError):
+        a.popmax()
+
+
+def test_treedict_pop_le():
+    a = TreeDict()
+    for key in (7, 3, 9, 1, 5):
+        a[key] = key
+    assert a.pop_le(5) == [(1, 1), (3, 3), (5, 5)]
+    assert list(a) == [7, 9]
+    assert a.pop_le(0) == []
+    assert a.pop_le(100) == [(7, 7), (9, 9)]
+    assert not a
+
+
+def test_avlnode_stays_balanced_on_random_inserts_and_deletes():
+    import random
+
+    keys = list(range(300))
+    random.shuffle(keys)
+    a = TreeDict()
+    for key in keys:
+        a[key] = key
+    for key in keys[:200]:
+        del a[key]
+    a.popmin()
+    a.popmax()
+    assert all(node.balanced for node in a.root)
+    assert list(a) == sorted(keys[200:])[1:-1]
+
+
+def test_treedict_delete_keeps_order():
+    import random
+
+    keys = list(range(500))
+    random.shuffle(keys)
+    a = TreeDict()
+    for key in keys:
+        a[key] = key
+    for key in keys[::2]:
+        del a[key]
+    assert list(a) == sorted(keys[1::2])
+    assert len(a) == 250
+
+
+def test_treemultidict_keeps_keys_with_same_sort_key():
+    a = TreeMultiDict(key=len)
+    a["red"] = 1
+    a["blue"] = 2
+    a["1234"] = 3
+    a["abc"] = 4
+    a["red"] = 5
+    assert len(a) == 4
+    assert list(a) == ["red", "abc", "blue", "1234"]
+    assert a["blue"] == 2
+    assert a["1234"] == 3
+    assert a.get_all("xyz") == [5, 4]
+    assert a["aaaa":] == [2, 3]
+    assert a[:"aaaa"] == [5, 4]
+    assert a[::-1] == [3, 2, 4, 5]
+    assert a[::2] == [5, 2]
+    with pytest.raises(KeyError):
+        a["xyz"]
+
+
+def test_treemultidict_delete():
+    a = TreeMultiDict(key=len)
+    for word in ("red", "abc", "xyz", "blue"):
+        a[word] = word.upper()
+    del a["red"]
+    assert a.get_all("...") == ["ABC", "XYZ"]
+    assert a.get_closest_keys("...") == ("abc", "abc")
+    del a["xyz"]
+    del a["abc"]
+    assert list(a) == ["blue"]
+    with pytest.raises(KeyError):
+        del a["abc"]
+    assert len(a) == 1
+
+
+def test_treemultidict_pop_and_nearest():
+    a = TreeMultiDict(key=lambda k: k // 10)
+    for number in (11, 25, 12, 13, 21, 31):
+        a[number] = str(number)
+    assert a.min_item() == (11, "11")
+    assert a.max_item() == (31, "31")
+    assert a.nearest(20, 3) == [25, 21, 11]
+    assert a.popmin() == (11, "11")
+    assert a.pop_le(19) == [(12, "12"), (13, "13")]
+    assert a.popmax() == (31, "31")
+    assert len(a) == 2
+    assert list(a) == [25, 21]
+
+
+def test_interval_treedict_point_and_range_queries():
+    a = IntervalTreeDict()
+    a[0, 10] = "a"
+    a[5, 7] = "b"
+    a[8, 20] = "c"
+    a[12, 15] = "d"
+    assert a.overlapping(6) == [((0, 10), "a"), ((5, 7), "b")]
+    assert a.overlapping(10) == [((8, 20), "c")]
+    assert a.overlapping(7, 9) == [((0, 10), "a"), ((8, 20), "c")]
+    assert a.overlapping(20) == []
+    assert a.overlapping(15, 30) == [((8, 20), "c")]
+    with pytest.raises(ValueError):
+        a[5, 3] = "e"
+
+
+def test_interval_treedict_matches_brute_force():
+    import random
+
+    a = IntervalTreeDict()
+    intervals = set()
+    for _ in range(300):
+        start = random.randrange(1000)
+        interval = start, start + random.randrange(1, 50)
+        a[interval] = None
+        intervals.add(interval)
+    for interval in random.sample(sorted(intervals), 100):
+        del a[interval]
+        intervals.remove(interval)
+    for _ in range(50):
+        start = random.randrange(1050)
+        stop = start + random.randrange(30)
+        expected = sorted(i for i in intervals if i[0] < stop and i[1] > start)
+        assert [key for key, _ in a.overlapping(start, stop)] == expected
+        expected = sorted(i for i in intervals if i[0] <= start < i[1])
+        assert [key for key, _ in a.overlapping(start)] == expected
+
+
+def test_treedict_get_many():
+    import random
+
+    a = TreeDict()
+    for key in random.sample(range(1000), 500):
+        a[key] = str(key)
+    probes = [random.randrange(-10, 1010) for _ in range(300)]
+    assert a.get_many(probes) == [a.get(key) for key in probes]
+    assert a.get_many(probes, default="-", input_order=False) == [
+        (key, a.get(key, "-")) for key in sorted(probes)
+    ]
+    assert a.contains_many(probes) == [key in a for key in probes]
+    assert TreeDict().get_many([2, 1], 0) == [0, 0]
+    assert TreeDict().get_many([2, 1], input_order=False) == [(1, None), (2, None)]
+
+
+def test_treedict_get_many_with_key_function():
+    a = TreeMultiDict(key=len)
+    a.update({"red": 1, "blue": 2, "abc": 3})
+    b = TreeDict({"red": 1, "blue": 2, "abc": 3}, key=str.upper)
+    probes = ["blue", "abc", "x", "red", "RED"]
+    assert a.get_many(probes) == [2, 3, None, 1, None]
+    assert a.contains_many(probes) == [True, True, False, True, False]
+    assert b.get_many(probes) == [2, 3, None, 1, 1]
+
+
+def test_treedict_get_many_incompatible_keys_raise_key_error():
+    a = TreeDict({1: "1", 2: "2"})
+    with pytest.raises(KeyError):
+        a["x"]
+    with pytest.raises(KeyError):
+        a.get_many([1, "x"])
+
+
+def test_treedict_from_sorted_builds_balanced_tree():
+    a = TreeDict.from_sorted((i, str(i)) for i in range(1023))
+    assert a.root.depth == 10
+    assert len(a) == 1023
+    assert a[500] == "500"
+    assert a[10:13] == ["10", "11", "12"]
+    a[2000] = "2000"
+    del a[0]
+    assert list(a) == list(range(1, 1023)) + [2000]
+
+
+@pytest.mark.parametrize(
+    "tree",
+    [
+        TreeDict(),
+        TreeDict({i: -i for i in range(100)}),
+        TreeDict({"B": 1, "a": 2, "C": 3}, key=str.lower),
+        TreeMultiDict({"red": 1, "blue": 2, "abc": 3, "de": 4}, key=len),
+        IntervalTreeDict({(0, 10): "a", (5, 7): "b", (8, 20): "c"}),
+    ],
+)
+def test_treedict_pickle_roundtrip(tree):
+    import pickle
+
+    new = pickle.loads(pickle.dumps(tree))
+    assert type(new) is type(tree)
+    assert new.key == tree.key
+    assert list(new.items()) == list(tree.items())
+    assert len(new) == len(tree)
+    if tree:
+        assert new.root.balanced
+        assert new[:] == tree[:]
+
+
+def test_pickled_treedict_is_flat():
+    import pickle
+
+    # A degenerate, unbalanced, tree would need deep recursion to be serialized:
+    node = PlainNode(2999)
+    for i in reversed(range(2999)):
+        node = PlainNode(i, right=node)
+    tree = TreeDict()
+    tree.root = node
+    assert tree.root.depth == 3000
+    new = pickle.loads(pickle.dumps(tree))
+    assert list(new) == list(range(3000))
+    assert new.root.depth == 12
+
+
+def test_treedict_maxlen_evicts_min():
+    evicted = []
+    a = TreeDict(maxlen=3, on_evict=lambda k, v: evicted.append((k, v)))
+    for key in (5, 1, 7, 3, 9, 0):
+        a[key] = str(key)
+    assert list(a) == [5, 7, 9]
+    assert evicted == [(1, "1"), (3, "3"), (0, "0")]
+    a[7] = "seven"
+    assert len(a) == 3
+    assert len(evicted) == 3
+
+
+def test_treedict_maxlen_evicts_max():
+    a = TreeDict({i: i for i in range(10)}, maxlen=4, evict="max")
+    assert list(a) == [0, 1, 2, 3]
+    a[-1] = -1
+    assert list(a) == [-1, 0, 1, 2]
+
+
+def test_treedict_maxlen_on_variants():
+    import pickle
+
+    a = TreeMultiDict(key=len, maxlen=2)
+    a.update({"a": 1, "bb": 2, "cc": 3})
+    assert list(a) == ["bb", "cc"]
+    b = IntervalTreeDict({(0, 1): 0, (2, 3): 1}, maxlen=1, evict="max")
+    assert list(b) == [(0, 1)]
+    c = TreeDict.from_sorted(((i, i) for i in range(10)), maxlen=5)
+    assert list(c) == [5, 6, 7, 8, 9]
+    c = pickle.loads(pickle.dumps(c))
+    c[10] = 10
+    assert list(c) == [6, 7, 8, 9, 10]
+    with pytest.raises(ValueError):
+        TreeDict(evict="oldest")
+
+
+def test_treedict_stats_without_instrumentation():
+    a = TreeDict({i: i for i in range(7)})
+    assert a.node_cls is AVLNode
+    stats = a.stats()
+    assert stats == {"len": 7, "depth": 3, "depth_histogram": {1: 1, 2: 2, 3: 4}}
+    assert TreeDict().stats()["depth_histogram"] == {}
+
+
+def test_treedict_instrumentation_counters():
+    import pickle
+
+    calls = []
+    a = TreeDict(key=lambda k: calls.append(k) or k, instrument=True)
+    for i in range(100):
+        a[i] = i
+    stats = a.stats(reset=True)
+    assert stats["len"] == 100
+    assert stats["rotations"] > 0
+    assert stats["comparisons"] > 0
+    assert stats["key_func_calls"] == len(calls)
+    assert stats["slice_steps"] == 0
+    assert a[10:20] == list(range(10, 20))
+    assert a.nearest(50, 3) == [50, 49, 51]
+    stats = a.stats(reset=True)
+    assert stats["rotations"] == 0
+    assert stats["slice_steps"] >= 10
+    a[50]
+    assert 0 < a.stats()["comparisons"] <= 2 * a.stats()["depth"]
+
+    b = pickle.loads(pickle.dumps(TreeDict({1: 1}, instrument=True)))
+    b[2] = 2
+    assert b.stats()["comparisons"] > 0
+
+
+def test_concurrent_treedict_works_as_treedict():
+    import pickle
+
+    a = ConcurrentTreeDict({i: str(i) for i in range(10)}, maxlen=8)
+    assert list(a) == list(range(2, 10))
+    assert a[3:5] == ["3", "4"]
+    assert a.floor_key(4.5) == 4
+    assert a.pop_le(3) == [(2, "2"), (3, "3")]
+    assert len(a) == 6
+    assert pickle.loads(pickle.dumps(a))[:] == a[:]
+    snapshot = a.snapshot()
+    assert type(snapshot) is TreeDict
+    a.clear()
+    assert not a
+    assert len(snapshot) == 6
+
+
+def test_concurrent_treedict_iteration_is_fail_fast():
+    a = ConcurrentTreeDict({i: i for i in range(10)})
+    iterator = iter(a)
+    assert next(iterator) == 0
+    a[20] = 20
+    with pytest.raises(RuntimeError):
+        next(iterator)
+
+
+def test_concurrent_treedict_failed_writes_keep_iterators_working():
+    a = ConcurrentTreeDict({i: i for i in range(10)})
+    iterator = iter(a)
+    assert next(iterator) == 0
+    with pytest.raises(KeyError):
+        del a[99]
+    with pytest.raises(KeyError):
+        a.pop(99)
+    assert next(iterator) == 1
+
+
+def test_concurrent_treedict_readers_and_writers():
+    import random
+
+    a = ConcurrentTreeDict({i: i for i in range(0, 1000, 2)})
+    errors = []
+    stop = threading.Event()
+
+    def writer(offset):
+        keys = list(range(offset, 1000, 4))
+        for _ in range(3):
+            random.shuffle(keys)
+            for key in keys:
+                a[key] = key
+            for key in keys:
+                del a[key]
+
+    def reader():
+        while not stop.is_set():
+            try:
+                values = a[100:200]
+                assert values == sorted(values)
+                # Writers never touch the even keys: all of them are always seen
+                assert [value for value in values if value % 2 == 0] == list(
+                    range(100, 200, 2)
+                )
+                snapshot = a.snapshot()
+                assert all(key == value for key, value in snapshot.items())
+                a.nearest(501, 4)
+                try:
+                    keys = list(a)
+                    assert keys == sorted(keys)
+                except RuntimeError:
+                    pass
+            except Exception as error:
+                errors.append(error)
+                return
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    writers = [threading.Thread(target=writer, args=(i,)) for i in (1, 3)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert not errors
+    assert list(a) == list(range(0, 1000, 2))
+    assert a.root.balanced
+
+
+def test_concurrent_treedict_compound_writes_are_atomic():
+    import sys
+
+    errors = []
+
+    def drain(a, counters, result):
+        try:
+            while True:
+                try:
+                    result.append(a.popitem())
+                except KeyError:
+                    break
+            for i in range(20):
+                # A list created by another thread is never replaced
+                counters.setdefault(i, []).append(i)
+            repr(a)
+        except Exception as error:
+            errors.append(error)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(20):
+            a = ConcurrentTreeDict({i: i for i in range(200)})
+            counters = ConcurrentTreeDict()
+            popped = [[] for _ in range(4)]
+            threads = [
+                threading.Thread(target=drain, args=(a, counters, result))
+                for result in popped
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not errors
+            assert not a
+            # A KeyError before the tree was empty would leave items behind
+            assert sorted(item for result in popped for item in result) == [
+                (i, i) for i in range(200)
+            ]
+            assert all(value == [i] * 4 for i, value in counters.items())
+    finally:
+        sys.setswitchinterval(interval)
@@ -1,6 +1,13 @@
 import pytest
 
-from extradict.trie import PrefixCharTrie, PatternCharTrie, NormalizedTrie
+from extradict.trie import (
+    PrefixCharTrie,
+    PatternCharTrie,
+    NormalizedTrie,
+    RadixTrie,
+    ScoredTrie,
+    SuffixArrayTrie,
+)
 from extradict.trie import _WORD_END, _ENTRY_END
 
 
@@ -15,38 +22,48 @@ def test_chartrie_simple_prefix_works():
     assert a["car"].contents == {"car", "carpet"}
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_chartrie_len_works(cls):
     a = cls(initial=["car", "carpet"])
     assert len(a) == 2
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_chartrie_iter_works(cls):
     a = cls(initial=["car", "carpet"])
     assert sorted(a) == ["car", "carpet"]
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_chartrie_works_and_exclude_others(cls):
     a = cls(initial=["car", "carpet", "java", "javascript"])
     assert a["car"].contents == {"car", "carpet"}
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_chartrie_update_works(cls):
     a = cls(initial=["car", "carpet"])
     a.update(["java", "javascript"])
     assert a["jav"].contents == {"java", "javascript"}
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_chartrie_returns_empty_on_non_existing_pattern(cls):
     a = cls(initial=["car", "carpet"])
     assert len(a["java"]) == 0
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, SuffixArrayTrie))
 @pytest.mark.parametrize("sentinel", [_WORD_END, _ENTRY_END])
 def test_trie_keys_cant_contain_sentinel_values(cls, sentinel):
     a = cls(initial=["car", "carpet"])
@@ -70,7 +87,9 @@ def test_modifying_prefixed_pattern_trie_raises_value_error():
         a["car"].add("pet")
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_shallow_copy_creates_indepent_chartrie(cls):
     from copy import copy
 
@@ -82,7 +101,9 @@ def test_shallow_copy_creates_indepent_chartrie(cls):
     assert "carpet" not in a
 
 
-@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, RadixTrie, SuffixArrayTrie)
+)
 def test_copy_method_creates_indepent_chartrie(cls):
     a = cls(initial=["car"])
     b = a.copy()
@@ -176,3 +197,565 @@ def test_normalized_trie_discard():
     assert len(a) == 1
     a.discard("maçã")
     assert len(a) == 0
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, RadixTrie))
+def test_prefix_tries_simple_prefix_and_views(cls):
+    a = cls(initial=["car", "carpet", "cart", "cat", "dog"])
+    assert a["car"].contents == {"car", "carpet", "cart"}
+    assert a["ca"]["r"].contents == {"car", "carpet", "cart"}
+    assert a["carp"].contents == {"carpet"}
+    assert a["d"].contents == {"dog"}
+    assert "carpet" in a["car"]
+    a["car"].add("go")
+    assert "cargo" in a
+
+
+def test_radix_trie_splits_and_merges_edges():
+    a = RadixTrie(["romane", "romanus", "romulus", "rubens"])
+    assert a.root.children["r"].label == "r"
+    assert a.root.children["r"].children["o"].label == "om"
+    assert "roman" not in a
+    assert "rom" not in a
+    a.add("roman")
+    assert "roman" in a
+    assert len(a) == 5
+    a.discard("romulus")
+    assert a.root.children["r"].children["o"].label == "oman"
+    a.discard("roman")
+    a.discard("rubens")
+    assert a.root.children["r"].label == "roman"
+    assert sorted(a) == ["romane", "romanus"]
+    with pytest.raises(KeyError):
+        a.discard("roman")
+    a.discard("romane")
+    a.discard("romanus")
+    assert not a.root.children
+    assert len(a) == 0
+
+
+def test_radix_trie_empty_string_and_mid_edge_prefix():
+    a = RadixTrie(["", "abcdef"])
+    assert "" in a
+    assert len(a) == 2
+    assert a["abc"].contents == {"abcdef"}
+    assert a["abd"].contents == set()
+    a.discard("")
+    assert "" not in a
+    assert list(a) == ["abcdef"]
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, RadixTrie))
+def test_prefix_tries_len_tracks_prefix_counts(cls):
+    a = cls(initial=["car", "carpet", "cart", "cat", "dog"])
+    assert len(a) == 5
+    assert len(a["ca"]) == 4
+    assert len(a["car"]) == 3
+    assert len(a["carp"]) == 1
+    assert len(a["x"]) == 0
+    a.add("car")
+    assert len(a) == 5 and len(a["car"]) == 3
+    a["car"].add("go")
+    assert len(a["ca"]) == 5
+    a.discard("carpet")
+    assert len(a["car"]) == 3
+    assert len(a["carp"]) == 0
+    assert len(a) == 5
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, NormalizedTrie))
+def test_trie_len_does_not_retrieve_contents(cls, monkeypatch):
+    a = cls(initial=["car", "carpet", "oscar"])
+    a.add("car")
+    monkeypatch.setattr(cls, "_contents", None)
+    assert len(a) == 3
+    assert "3 elements" in repr(a)
+
+
+def test_copied_prefix_trie_keeps_independent_counts():
+    from copy import copy
+
+    a = PrefixCharTrie(initial=["car", "carpet"])
+    b = copy(a)
+    b.add("cart")
+    assert len(a["car"]) == 2
+    assert len(b["car"]) == 3
+    assert len(PrefixCharTrie(root=a.data)) == 2
+
+
+def test_normalized_trie_len_with_equivalent_words():
+    a = NormalizedTrie(initial=["maca", "maçã"])
+    assert len(a) == 2
+    assert len(a["mac"]) == 2
+    a.discard("maca")
+    assert len(a) == 1
+    assert a["mac"].contents == {"maçã"}
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, RadixTrie))
+def test_prefix_tries_counts_match_contents_on_random_changes(cls):
+    import random
+
+    rng = random.Random(3)
+    words = ["".join(rng.choices("abc", k=rng.randint(0, 5))) for _ in range(200)]
+    a = cls(words)
+    for word in words[::3]:
+        if word in a:
+            a.discard(word)
+    for prefix in ("", "a", "ab", "abc", "b", "ca", "cab"):
+        assert len(a[prefix]) == len(a[prefix].contents)
+
+
+def test_pattern_trie_ignores_the_empty_word():
+    a = PatternCharTrie(["car"])
+    a.add("")
+    a.add("")
+    assert len(a) == 1
+    assert list(a) == ["car"]
+    assert "" not in a
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, RadixTrie))
+def test_prefix_tries_iter_prefix_orders_and_limits(cls):
+    a = cls(initial=["carpet", "car", "cart", "cat", "cargo", "dog", "c"])
+    assert list(a.iter_prefix("car")) == ["car", "cargo", "carpet", "cart"]
+    assert list(a.iter_prefix("car", limit=2)) == ["car", "cargo"]
+    assert list(a.iter_prefix("ca", order="shortest")) == [
+        "car",
+        "cat",
+        "cart",
+        "cargo",
+        "carpet",
+    ]
+    assert list(a.iter_prefix("x")) == []
+    assert list(a["ca"].iter_prefix("rp")) == ["carpet"]
+    assert list(a) == ["c", "car", "cargo", "carpet", "cart", "cat", "dog"]
+    with pytest.raises(ValueError):
+        a.iter_prefix("c", order="random")
+
+
+def test_iter_prefix_stops_walking_after_limit():
+    a = PrefixCharTrie(initial=["aa", "ab", "ac"])
+    visited = []
+    original = a._edges
+
+    def edges(state):
+        visited.append(state[0])
+        return original(state)
+
+    a._edges = edges
+    assert list(a.iter_prefix("a", limit=1)) == ["aa"]
+    assert visited == ["a"]
+
+
+def test_pattern_trie_iter_prefix_yields_each_word_once():
+    a = PatternCharTrie(initial=["abab", "cab", "abc", "xyz"])
+    assert sorted(a.iter_prefix("ab")) == ["abab", "abc", "cab"]
+    assert len(list(a.iter_prefix("ab"))) == 3
+    assert list(a.iter_prefix("ab", order="shortest"))[-1] == "abab"
+    assert sorted(a) == ["abab", "abc", "cab", "xyz"]
+
+
+def test_normalized_trie_iter_prefix():
+    a = NormalizedTrie(initial=["maçã", "maca", "macaco"])
+    assert list(a.iter_prefix("maç", order="shortest")) == ["maca", "maçã", "macaco"]
+    assert sorted(a) == ["maca", "macaco", "maçã"]
+
+
+def test_scored_trie_top_k():
+    a = ScoredTrie({"car": 5, "carpet": 9, "cart": 2, "cat": 7, "dog": 10})
+    assert a.top_k("ca", 2) == [("carpet", 9), ("cat", 7)]
+    assert a.top_k("car", 10) == [("carpet", 9), ("car", 5), ("cart", 2)]
+    assert a.top_k("", 1) == [("dog", 10)]
+    assert a.top_k("x", 3) == []
+    assert a["ca"].top_k("r", 1) == [("carpet", 9)]
+    a.add("cart", 20)
+    assert a.top_k("c", 1) == [("cart", 20)]
+    assert a.get_score("cart") == 20
+    assert len(a) == 5
+    a.discard("cart")
+    a.discard("carpet")
+    assert a.top_k("car") == [("car", 5)]
+    assert a.get_score("carpet") is None
+
+
+def test_scored_trie_ties_and_plain_words():
+    a = ScoredTrie(["b", "a", "ab"])
+    a.add("c", 2)
+    assert a.top_k("", 3) == [("c", 2), ("a", 1), ("ab", 1)]
+
+
+def test_scored_trie_top_k_matches_sorting_everything():
+    import random
+
+    rng = random.Random(7)
+    words = {
+        "".join(rng.choices("abc", k=rng.randint(1, 6))): rng.randint(0, 50)
+        for _ in range(300)
+    }
+    a = ScoredTrie(words)
+    for word in list(words)[::4]:
+        a.discard(word)
+        del words[word]
+    for prefix in ("", "a", "ab", "cb", "bca"):
+        expected = sorted(
+            ((word, score) for word, score in words.items() if word.startswith(prefix)),
+            key=lambda item: (-item[1], item[0]),
+        )[:5]
+        assert a.top_k(prefix, 5) == expected
+
+
+def test_scored_trie_copies_keep_scores():
+    from copy import copy
+
+    a = ScoredTrie({"car": 3, "cat": 4})
+    for b in (a.copy(), copy(a)):
+        b.add("car", 10)
+        assert b.top_k("ca", 1) == [("car", 10)]
+        assert a.top_k("ca", 1) == [("cat", 4)]
+
+
+@pytest.mark.parametrize("cls", (PatternCharTrie, SuffixArrayTrie))
+def test_pattern_tries_match_in_the_middle(cls):
+    a = cls(initial=["car", "carpet", "oscar", "java", "abab"])
+    assert a["car"].contents == {"car", "carpet", "oscar"}
+    assert a["a"]["r"].contents == {"car", "carpet", "oscar"}
+    assert len(a["ab"]) == 1
+    assert "carpet" in a and "arpe" not in a
+    a.discard("car")
+    assert a["car"].contents == {"carpet", "oscar"}
+    assert len(a) == 4
+    with pytest.raises(ValueError):
+        a["car"].add("pet")
+
+
+def test_suffix_array_trie_rebuilds_after_changes():
+    a = SuffixArrayTrie(["banana", "bandana"])
+    assert a["ana"].contents == {"banana", "bandana"}
+    a.add("cabana")
+    a.discard("banana")
+    assert a["ana"].contents == {"bandana", "cabana"}
+    assert a["nan"].contents == set()
+    a.add("banana")
+    assert a["nan"].contents == {"banana"}
+    assert list(a) == ["bandana", "cabana", "banana"]
+
+
+def test_suffix_array_trie_agrees_with_substring_search():
+    import random
+
+    rng = random.Random(11)
+    words = {"".join(rng.choices("abc", k=rng.randint(1, 12))) for _ in range(200)}
+    a = SuffixArrayTrie(words)
+    for pattern in ("a", "ab", "cab", "bbb", "abcab", "ca"):
+        assert a[pattern].contents == {word for word in words if pattern in word}
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, NormalizedTrie))
+def test_discard_prunes_entries_leading_to_no_words(cls):
+    a = cls(initial=["car", "cart"])
+    entries = len(a.data)
+    a.add("carpet")
+    a.discard("carpet")
+    assert len(a.data) == entries
+    a.discard("cart")
+    a.discard("car")
+    assert dict(a.data) == {"": set()}
+    assert list(a) == []
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+def test_trie_size_stays_stable_under_add_discard_cycles(cls):
+    import random
+
+    rng = random.Random(5)
+    a = cls(initial=["session", "sessions", "seat"])
+    baseline = dict(a.data)
+    for _ in range(20):
+        names = {
+            "session-" + "".join(rng.choices("0123456789abcdef", k=8))
+            for _ in range(20)
+        }
+        a.update(names)
+        assert len(a.data) > len(baseline)
+        for name in names:
+            a.discard(name)
+        assert a.data == baseline
+        assert len(a) == 3
+    assert sorted(a) == ["seat", "session", "sessions"]
+
+
+def test_view_survives_pruning_of_its_pattern():
+    a = PrefixCharTrie(initial=["car", "carpet"])
+    b = a["carp"]
+    a.discard("carpet")
+    assert len(b) == 0
+    assert list(b) == []
+    assert len(b["e"]) == 0
+    b.add("et")
+    assert "carpet" in a
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, SuffixArrayTrie))
+def test_vacuum_keeps_words_and_shared_views(cls):
+    words = ["car", "carpet", "cart", "oscar", "dog"]
+    a = cls(initial=words)
+    view = a["ca"]
+    for word in words[1:4]:
+        a.discard(word)
+    a.vacuum()
+    assert sorted(a) == ["car", "dog"]
+    assert len(a) == 2
+    assert view.contents == {"car"}
+    a.add("cab")
+    assert view.contents == {"car", "cab"}
+    if cls is not SuffixArrayTrie:
+        assert a.data == cls(initial=["car", "dog", "cab"]).data
+
+
+def test_normalized_trie_vacuum():
+    a = NormalizedTrie(initial=["maçã", "maca", "macaco"])
+    a.discard("macaco")
+    a.discard("maca")
+    a.vacuum()
+    assert list(a) == ["maçã"]
+    assert a["mac"].contents == {"maçã"}
+    assert a.data == PatternCharTrie(initial=["maca"]).data
+
+
+def test_vacuum_shrinks_data_after_mass_discard():
+    import sys
+
+    a = PrefixCharTrie(initial=[f"word{i}" for i in range(2000)])
+    for i in range(10, 2000):
+        a.discard(f"word{i}")
+    before = sys.getsizeof(a.data)
+    a.vacuum()
+    assert sys.getsizeof(a.data) < before
+    assert len(a) == 10
+
+
+def _levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        previous, row = row, [i]
+        for j, char_b in enumerate(b, 1):
+            row.append(
+                min(
+                    row[j - 1] + 1,
+                    previous[j] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+    return row[-1]
+
+
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, NormalizedTrie, RadixTrie, ScoredTrie)
+)
+def test_fuzzy_search(cls):
+    a = cls(initial=["car", "cart", "carpet", "cat", "care", "scar", "dog"])
+    assert a.fuzzy("cars", 1) == [("car", 1), ("care", 1), ("cart", 1)]
+    assert a.fuzzy("car", 0) == [("car", 0)]
+    assert a.fuzzy("dgo", 2) == [("dog", 2)]
+    assert a.fuzzy("xyzw", 2) == []
+    assert a.fuzzy("", 3) == [("car", 3), ("cat", 3), ("dog", 3)]
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, RadixTrie))
+def test_fuzzy_search_in_views(cls):
+    a = cls(initial=["car", "cart", "scar", "bar", "cars"])
+    assert a["ca"].fuzzy("cbr", 1) == [("car", 1)]
+    assert ("scar", 1) in a["sc"].fuzzy("car", 1)
+    assert ("bar", 1) not in a["ca"].fuzzy("car", 1)
+
+
+def test_fuzzy_search_ignores_accents_in_normalized_trie():
+    a = NormalizedTrie(initial=["maçã", "maca", "macaco"])
+    assert a.fuzzy("maça", 1) == [("maca", 0), ("maçã", 0)]
+    assert a.fuzzy("macaca", 1) == [("macaco", 1)]
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, RadixTrie))
+def test_fuzzy_search_agrees_with_brute_force(cls):
+    import random
+
+    rng = random.Random(17)
+    words = {"".join(rng.choices("abc", k=rng.randint(0, 6))) for _ in range(300)}
+    words.discard("")
+    a = cls(words)
+    for query in ("abc", "", "cabba", "bbbbbb"):
+        for distance in (0, 1, 2):
+            expected = sorted(
+                ((word, _levenshtein(query, word)) for word in words),
+                key=lambda item: (item[1], item[0]),
+            )
+            expected = [item for item in expected if item[1] <= distance]
+            assert a.fuzzy(query, distance) == expected
+
+
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, NormalizedTrie, RadixTrie, ScoredTrie)
+)
+def test_prefixes_of_text(cls):
+    a = cls(initial=["a", "an", "ant", "antelope", "cat", "dog"])
+    assert list(a.prefixes_of("antelopes")) == ["a", "an", "ant", "antelope"]
+    assert a.longest_prefix_of("ants") == "ant"
+    assert a.longest_prefix_of("ca") is None
+    assert a.longest_prefix_of("bee", "") == ""
+    assert list(a.prefixes_of("")) == []
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, RadixTrie))
+def test_prefixes_of_text_in_views(cls):
+    a = cls(initial=["a", "an", "ant", "cant"])
+    assert list(a["an"].prefixes_of("ants")) == ["an", "ant"]
+    assert a["an"].longest_prefix_of("a") is None
+
+
+def test_prefixes_of_text_ignores_accents_in_normalized_trie():
+    a = NormalizedTrie(initial=["maçã", "maca", "mac"])
+    assert list(a.prefixes_of("macas")) == ["mac", "maca", "maçã"]
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, RadixTrie))
+def test_prefixes_of_text_agrees_with_slicing(cls):
+    import random
+
+    rng = random.Random(23)
+    words = {"".join(rng.choices("abc", k=rng.randint(0, 6))) for _ in range(300)}
+    words.discard("")
+    a = cls(words)
+    for _ in range(50):
+        text = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+        expected = [text[:i] for i in range(len(text) + 1) if text[:i] in words]
+        assert list(a.prefixes_of(text)) == expected
+
+
+@pytest.mark.parametrize(
+    "cls", (PrefixCharTrie, PatternCharTrie, NormalizedTrie, RadixTrie, ScoredTrie)
+)
+def test_match_wildcards(cls):
+    a = cls(initial=["cat", "cot", "cart", "coat", "dog", "scat"])
+    assert a.match("c?t") == ["cat", "cot"]
+    assert a.match("c*t") == ["cart", "cat", "coat", "cot"]
+    assert a.match("*at") == ["cat", "coat", "scat"]
+    assert a.match("[cd]o*") == ["coat", "cot", "dog"]
+    assert a.match("[!c]*") == ["dog", "scat"]
+    assert a.match("c[a-b]?") == ["cat"]
+    assert a.match("*") == sorted(a)
+    assert a.match("x*") == []
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, RadixTrie))
+def test_match_in_views(cls):
+    a = cls(initial=["cat", "cot", "scat", "dog"])
+    assert a["ca"].match("?a*") == ["cat"]
+    assert a["do"].match("c*") == []
+
+
+def test_match_ignores_accents_in_normalized_trie():
+    a = NormalizedTrie(initial=["maçã", "maca", "macaco"])
+    assert a.match("MAÇ?") == ["maca", "maçã"]
+    assert a.match("*co") == ["macaco"]
+
+
+def test_pattern_trie_match_walks_rotations_of_the_longest_literal():
+    a = PatternCharTrie(initial=["abcd", "xabzd", "ab", "zzabxdq", "ba"])
+    visited = []
+    original = a._edges
+    a._edges = lambda state: visited.append(state[0]) or original(state)
+    assert a.match("*ab?d*") == ["abcd", "xabzd", "zzabxdq"]
+    assert all(text.startswith("ab") for text in visited)
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie, RadixTrie))
+def test_match_agrees_with_fnmatch(cls):
+    import fnmatch
+    import random
+
+    rng = random.Random(29)
+    words = {"".join(rng.choices("abcd", k=rng.randint(1, 7))) for _ in range(300)}
+    a = cls(words)
+    globs = ["?", "a*", "*ab?d*", "[ab]*c", "*[!a]", "?b[c-d]*", "*a*b*a*", "[]a]*"]
+    globs += ["a[b", "**c", "abc"]
+    for glob in globs:
+        assert a.match(glob) == sorted(fnmatch.filter(words, glob))
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, PatternCharTrie))
+def test_from_iterable_builds_the_same_trie_as_adding(cls):
+    import gc
+    import random
+
+    rng = random.Random(31)
+    words = ["".join(rng.choices("abcd", k=rng.randint(1, 6))) for _ in range(300)]
+    a = cls(words)
+    b = cls.from_iterable(words)
+    c = cls.from_iterable(sorted(words), presorted=True)
+    for trie in (b, c):
+        assert trie.data == a.data
+        assert trie.counts == a.counts
+        assert set(trie) == set(words)
+    assert len(b["ab"]) == len(a["ab"])
+    assert gc.isenabled()
+    b.add("dddddddd")
+    assert "dddddddd" in b
+
+
+@pytest.mark.parametrize("cls", (PrefixCharTrie, NormalizedTrie))
+def test_from_iterable_pauses_the_gc_only_when_asked(cls):
+    import gc
+
+    seen = []
+
+    def words():
+        for word in ["car", "cart", "cat"]:
+            seen.append(gc.isenabled())
+            yield word
+
+    cls.from_iterable(words())
+    assert seen == [True] * 3
+    cls.from_iterable(words(), pause_gc=True)
+    assert seen[3:] == [False] * 3
+    assert gc.isenabled()
+
+
+def test_prefix_trie_counts_share_the_data_keys():
+    words = ["car", "cart", "carpet", "cat", "dog"]
+    a = PrefixCharTrie(words)
+    a.discard("cart")
+    tries = [a, PrefixCharTrie.from_iterable(words), PrefixCharTrie(root=a.data)]
+    for trie in tries:
+        keys = {key: key for key in trie.data}
+        assert trie.counts
+        assert all(keys[prefix] is prefix for prefix in trie.counts)
+
+
+def test_from_iterable_streams_sorted_files(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("car\ncarpet\ncart\ncat\n")
+    with open(path) as file:
+        a = PrefixCharTrie.from_iterable(
+            (line.rstrip("\n") for line in file), presorted=True
+        )
+    assert a["car"].contents == {"car", "carpet", "cart"}
+    assert len(a["ca"]) == 4
+
+
+def test_from_iterable_rejects_unsorted_or_invalid_words():
+    with pytest.raises(ValueError):
+        PrefixCharTrie.from_iterable(["cat", "car"], presorted=True)
+    with pytest.raises(ValueError):
+        PrefixCharTrie.from_iterable(["car" + _WORD_END])
+    with pytest.raises(ValueError):
+        PatternCharTrie.from_iterable(["car" + _WORD_END])
+
+
+def test_normalized_trie_from_iterable():
+    a = NormalizedTrie.from_iterable(["maçã", "Maca", "macaco"])
+    assert (
+        a["mac"].contents == NormalizedTrie(["maçã", "Maca", "macaco"])["mac"].contents
+    )
+    assert "Maca" in a
+    assert len(a) == 3